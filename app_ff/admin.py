@@ -1,8 +1,12 @@
 from django.contrib import admin
-from .models import FamilyMember, Tag, Transaction, Expense, Income
+from .models import FamilyMember, Tag, Transaction, Expense, Income, MonthlyRollup, Job, IdempotencyKey, MemberBalance
 
 admin.site.register(FamilyMember)
 admin.site.register(Tag)
 admin.site.register(Transaction)
 admin.site.register(Expense)
 admin.site.register(Income)
+admin.site.register(MonthlyRollup)
+admin.site.register(Job)
+admin.site.register(IdempotencyKey)
+admin.site.register(MemberBalance)
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class AppFfConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app_ff'
+
+    def ready(self):
+        # Registra os receivers (cache de tags e membros, saldo dos membros nas remoções)
+        # e o que instala a medição de consultas em cada conexão
+        from . import instrumentation, signals  # noqa: F401
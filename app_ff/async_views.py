@@ -0,0 +1,89 @@
+# Views assíncronas (somente leitura) para rodar sob ASGI: usam o ORM assíncrono do
+# Django e reaproveitam os serializers, a paginação e o resumo das views do DRF.
+from types import SimpleNamespace
+
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.request import Request
+
+from .models import Expense, Income
+from .pagination import KeysetPagination
+from .renderers import FastJSONRenderer
+from .views import (
+    EntryFilterSerializer, ExpenseViewSet, IncomeViewSet, TransactionViewSet, apply_list_filters,
+    format_summary_row, format_version, list_reader, parse_ordering, parse_selected_fields,
+    related_models, summary_querysets,
+)
+
+
+def json_response(data, **kwargs):
+    # Mesmo JSON das views do DRF (UUID, Decimal, datas)
+    return HttpResponse(FastJSONRenderer().render(data), content_type='application/json', **kwargs)
+
+
+def async_list_view(viewset):
+    """
+    Cria uma view assíncrona de listagem com a mesma consulta, leitura rápida, filtros,
+    ?ordering=, ?fields= e paginação por cursor do viewset informado, respondendo 304
+    quando nada mudou.
+    """
+    @require_GET
+    async def list_view(request):
+        try:
+            ordering = parse_ordering(request.GET, viewset.ordering, viewset.ordering_fields)
+            reader = list_reader(viewset.serializer_class, parse_selected_fields(request.GET, viewset.serializer_class), ordering)
+            queryset = apply_list_filters(viewset.queryset.all(), request.GET, viewset.filter_serializer_class)
+        except ValidationError as error:
+            return json_response(error.detail, status=error.status_code)
+
+        state = await queryset.aaggregate(count=Count('pk'), updated_at=Max('updated_at'))
+        related = [(await model.objects.aaggregate(updated_at=Max('updated_at')))['updated_at']
+                   for model in related_models(viewset.queryset.model, viewset.related_fields)]
+        etag = quote_etag(f"json-{format_version(state['count'], [state['updated_at']] + related)}")
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        paginator = KeysetPagination()
+        try:
+            page = await paginator.apaginate_queryset(reader.queryset(queryset), Request(request), SimpleNamespace(ordering=ordering))
+        except APIException as error:
+            return json_response({'detail': error.detail}, status=error.status_code)
+
+        data = reader.represent(page)
+        response = json_response({
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
+            'results': data,
+        })
+        response['ETag'] = etag
+        return response
+
+    return list_view
+
+
+transaction_list = async_list_view(TransactionViewSet)
+expense_list = async_list_view(ExpenseViewSet)
+income_list = async_list_view(IncomeViewSet)
+
+
+@require_GET
+async def summary(request):
+    """
+    Versão assíncrona de /api/summary/, com as mesmas dimensões e filtros.
+    """
+    serializer = EntryFilterSerializer(data=request.GET)
+    if not serializer.is_valid():
+        return json_response(serializer.errors, status=400)
+
+    result = {}
+    for transaction_type, model in [('expense', Expense), ('income', Income)]:
+        querysets = summary_querysets(serializer.filter_queryset(model.objects.all()))
+        result[transaction_type] = {}
+        for dimension, queryset in querysets.items():
+            result[transaction_type][dimension] = [format_summary_row(row) async for row in queryset.aiterator()]
+    return json_response(result)
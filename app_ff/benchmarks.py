@@ -0,0 +1,257 @@
+# Suíte de benchmarks executada pelo comando "benchmark". Cada caso é registrado com
+# o decorator @benchmark e recebe o estado montado pelo seu "setup" (fora da medição).
+# Cada execução roda dentro de uma transação desfeita no final, para que todas partam
+# da mesma base gerada pelo seed.
+import random
+import statistics
+import time
+
+from django.db import transaction as db_transaction
+from django.test import Client
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from . import forecast, installments, jobs
+from .models import BULK_BATCH_SIZE, Expense, FamilyMember, Income, MonthlyRollup, Tag, Transaction, clear_entries
+from .recurrence import add_months
+from .renderers import FastJSONRenderer
+from .seed import build_transactions
+from .views import ExpenseViewSet, TransactionViewSet, values_reader
+
+BENCHMARKS = []
+
+# Tamanhos de página medidos nas listagens
+PAGE_SIZES = (10, 100, 1000)
+
+# Requisições por execução nos casos de endpoints
+REQUESTS_PER_RUN = 10
+
+
+# Caso de benchmark: função medida, setup opcional e parâmetros fixos
+class Benchmark:
+    def __init__(self, name, func, setup=None, params=None):
+        self.name = name
+        self.func = func
+        self.setup = setup
+        self.params = params or {}
+
+    def run(self, repeat):
+        """
+        Executa o caso "repeat" vezes e devolve o menor tempo (total e de CPU do processo),
+        a mediana e as operações/s (a função medida retorna quantas operações fez).
+        """
+        timings = []
+        cpu_timings = []
+        operations = 0
+        for _ in range(repeat):
+            with db_transaction.atomic():
+                state = self.setup(**self.params) if self.setup else None
+                started, cpu_started = time.perf_counter(), time.process_time()
+                operations = self.func(state, **self.params)
+                timings.append(time.perf_counter() - started)
+                cpu_timings.append(time.process_time() - cpu_started)
+                db_transaction.set_rollback(True)
+
+        best = min(timings)
+        return {
+            'name': self.name,
+            'params': {key: getattr(value, '__name__', value) for key, value in self.params.items()},
+            'operations': operations,
+            'repeat': repeat,
+            'min_ms': round(best * 1000, 3),
+            'median_ms': round(statistics.median(timings) * 1000, 3),
+            'cpu_ms': round(min(cpu_timings) * 1000, 3),
+            'ops_per_second': round(operations / best, 1) if best else None,
+        }
+
+
+def benchmark(name, setup=None, **params):
+    """
+    Registra a função como caso de benchmark (pode ser usado várias vezes na mesma
+    função com parâmetros diferentes).
+    """
+    def register(func):
+        BENCHMARKS.append(Benchmark(name, func, setup, params))
+        return func
+    return register
+
+
+# -------------------- POSTAGEM --------------------
+
+def pending_transactions(recurrence, count):
+    rng = random.Random(count)
+    members = list(FamilyMember.objects.all())
+    tags = list(Tag.objects.all())
+    return Transaction.objects.bulk_create(
+        build_transactions(count, members, tags, rng, recurrence=recurrence), batch_size=BULK_BATCH_SIZE
+    )
+
+
+@benchmark('post.single', setup=pending_transactions, recurrence='one_time', count=100)
+@benchmark('post.single', setup=pending_transactions, recurrence='installment', count=100)
+@benchmark('post.single', setup=pending_transactions, recurrence='recurring', count=100)
+def post_single(transactions, **params):
+    for transaction in transactions:
+        transaction.post()
+    return len(transactions)
+
+
+@benchmark('post.many', setup=pending_transactions, recurrence='one_time', count=100)
+@benchmark('post.many', setup=pending_transactions, recurrence='installment', count=100)
+@benchmark('post.many', setup=pending_transactions, recurrence='recurring', count=100)
+def post_many(transactions, **params):
+    return len(Transaction.post_many(Transaction.objects.filter(pk__in=[t.pk for t in transactions])))
+
+
+@benchmark('jobs.post', setup=pending_transactions, recurrence='installment', count=100)
+def jobs_post(transactions, **params):
+    # Enfileira e executa (um worker, na mesma thread): custo da fila sobre o post.single
+    for transaction in transactions:
+        jobs.enqueue('post_transaction', {'id': transaction.pk})
+    return jobs.work('benchmark', burst=True)
+
+
+# -------------------- LEITURAS --------------------
+
+def get_endpoint(state, path, **params):
+    client = Client()
+    query = {'page_size': params['page_size']} if 'page_size' in params else {}
+    for _ in range(REQUESTS_PER_RUN):
+        response = client.get(path, query)
+        assert response.status_code == 200, response.status_code
+    return REQUESTS_PER_RUN
+
+
+for page_size in PAGE_SIZES:
+    for path in ('/api/transactions/', '/api/expenses/', '/api/incomes/'):
+        benchmark('list', path=path, page_size=page_size)(get_endpoint)
+
+
+# -------------------- SERIALIZAÇÃO --------------------
+
+def serialization_rows(viewset, rows, **params):
+    """
+    Completa a tabela do viewset até "rows" linhas (com transações e, para despesas,
+    uma despesa por transação) e devolve a consulta da listagem já limitada.
+    """
+    model = viewset.queryset.model
+    missing = rows - model.objects.count()
+    if missing > 0:
+        transactions = pending_transactions(None, missing)
+        if model is Expense:
+            Expense.objects.bulk_create([
+                Expense(transaction=transaction, amount=transaction.total_amount, date=transaction.due_date)
+                for transaction in transactions
+            ], batch_size=BULK_BATCH_SIZE)
+    return viewset.queryset.order_by(*viewset.ordering)[:rows]
+
+
+@benchmark('serialize.model', setup=serialization_rows, viewset=TransactionViewSet, rows=10000)
+@benchmark('serialize.model', setup=serialization_rows, viewset=ExpenseViewSet, rows=10000)
+def serialize_model(queryset, viewset, **params):
+    return len(viewset.serializer_class(queryset, many=True).data)
+
+
+@benchmark('serialize.values', setup=serialization_rows, viewset=TransactionViewSet, rows=10000)
+@benchmark('serialize.values', setup=serialization_rows, viewset=ExpenseViewSet, rows=10000)
+def serialize_values(queryset, viewset, **params):
+    reader = values_reader(viewset.serializer_class)
+    return len(reader.represent(reader.queryset(queryset)))
+
+
+def rendered_rows(viewset, rows, **params):
+    reader = values_reader(viewset.serializer_class)
+    return {'next': None, 'previous': None, 'results': reader.represent(reader.queryset(serialization_rows(viewset, rows)))}
+
+
+@benchmark('render', setup=rendered_rows, renderer=JSONRenderer, viewset=ExpenseViewSet, rows=10000)
+@benchmark('render', setup=rendered_rows, renderer=FastJSONRenderer, viewset=ExpenseViewSet, rows=10000)
+def render(data, renderer, **params):
+    renderer().render(data)
+    return len(data['results'])
+
+
+# -------------------- AGREGAÇÕES --------------------
+
+benchmark('aggregate.summary', path='/api/summary/')(get_endpoint)
+benchmark('aggregate.rollups', path='/api/rollups/', page_size=1000)(get_endpoint)
+
+
+def first_member(**params):
+    return FamilyMember.objects.order_by('pk').values_list('pk', flat=True).first()
+
+
+@benchmark('aggregate.member', setup=first_member, source='balance')
+@benchmark('aggregate.member', setup=first_member, source='summary')
+def member_dashboard(member_id, source, **params):
+    # Painel de um membro: saldo pré-calculado (uma leitura) ou agregação das despesas/receitas
+    path = f'/api/balances/{member_id}/' if source == 'balance' else f'/api/summary/?member={member_id}'
+    return get_endpoint(None, path)
+
+
+@benchmark('aggregate.rebuild_rollups')
+def rebuild_rollups(state):
+    return MonthlyRollup.rebuild()
+
+
+# -------------------- PROJEÇÃO --------------------
+
+def forecast_items(recurring, months, **params):
+    """
+    Acrescenta "recurring" despesas recorrentes pendentes (um quarto semanais) e lê os
+    itens da projeção, para medir só o cálculo.
+    """
+    transactions = build_transactions(recurring, list(FamilyMember.objects.all()), list(Tag.objects.all()),
+                                      random.Random(recurring), recurrence='recurring')
+    for i, transaction in enumerate(transactions):
+        transaction.frequency = 'weekly' if i % 4 == 0 else 'monthly'
+    Transaction.objects.bulk_create(transactions, batch_size=BULK_BATCH_SIZE)
+    start = timezone.localdate()
+    return forecast.load_items(end=add_months(start, months)), start
+
+
+@benchmark('forecast.project', setup=forecast_items, engine='numpy', recurring=5000, months=60)
+@benchmark('forecast.project', setup=forecast_items, engine='python', recurring=5000, months=60)
+def forecast_project(state, engine, months, **params):
+    items, start = state
+    project = forecast.project_numpy if engine == 'numpy' else forecast.project_python
+    return len(project(items, start, add_months(start, months), 'daily')[0])
+
+
+# -------------------- PARCELAS --------------------
+
+def installment_totals(transactions, **params):
+    # Só os valores (sem banco): totais em centavos e quantidades de parcelas
+    rng = random.Random(transactions)
+    return [rng.randint(100, 10 ** 7) for _ in range(transactions)], [rng.randint(2, 24) for _ in range(transactions)]
+
+
+@benchmark('installments.plan', setup=installment_totals, engine='numpy', transactions=100000)
+@benchmark('installments.plan', setup=installment_totals, engine='python', transactions=100000)
+def installments_plan(state, engine, transactions, **params):
+    totals, counts = state
+    if engine == 'numpy':
+        installments.plan(totals, counts)
+    else:
+        [installments.split(total, count) for total, count in zip(totals, counts)]
+    return transactions
+
+
+# -------------------- CONCLUSÃO (CLEAR) --------------------
+
+def pending_entries(model, count):
+    return list(model.objects.filter(status='pending').order_by('date', 'id')[:count])
+
+
+@benchmark('clear.single', setup=pending_entries, model=Expense, count=100)
+@benchmark('clear.single', setup=pending_entries, model=Income, count=100)
+def clear_single(entries, **params):
+    for entry in entries:
+        entry.clear()
+    return len(entries)
+
+
+@benchmark('clear.batch', setup=pending_entries, model=Expense, count=100)
+@benchmark('clear.batch', setup=pending_entries, model=Income, count=100)
+def clear_batch(entries, model, **params):
+    return clear_entries(model.objects.filter(pk__in=[entry.pk for entry in entries]))
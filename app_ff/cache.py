@@ -0,0 +1,146 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction as db_transaction
+
+# Configuração padrão do cache de dados de referência (tags e membros da família).
+# Pode ser sobrescrita com APP_FF_REFERENCE_CACHE no settings.
+DEFAULT_SETTINGS = {
+    'BACKEND': 'local',  # 'local' (LRU no processo) ou 'django' (cache compartilhado do Django)
+    'ALIAS': 'default',  # Alias em settings.CACHES usado pelo backend 'django'
+    'TIMEOUT': 300,      # Validade das entradas, em segundos
+    'MAX_SIZE': 1024,    # Máximo de entradas do backend 'local'
+}
+
+# Caches separados por uso, cada um configurável com APP_FF_<NOME>_CACHE: as projeções
+# (grandes e com uma chave nova a cada alteração dos dados) ficam em um LRU próprio, para
+# não tirarem do cache as tags e os membros
+CACHE_DEFAULTS = {
+    'reference': DEFAULT_SETTINGS,
+    'forecast': {**DEFAULT_SETTINGS, 'MAX_SIZE': 128},
+}
+
+# Chave do ID da tag padrão ("Other")
+DEFAULT_TAG_KEY = 'default_tag'
+
+
+# Cache LRU com expiração, local ao processo e seguro entre threads
+class LocalCache:
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# Cache compartilhado entre processos, usando um backend de settings.CACHES.
+# O ideal é um alias dedicado, já que clear() limpa o alias inteiro.
+class SharedCache:
+    def __init__(self, alias, timeout, name='reference'):
+        self.cache = caches[alias]
+        self.timeout = timeout
+        self.key_prefix = f'app_ff:{name}:'
+
+    def get(self, key):
+        return self.cache.get(self.key_prefix + key)
+
+    def set(self, key, value):
+        self.cache.set(self.key_prefix + key, value, self.timeout)
+
+    def delete(self, key):
+        self.cache.delete(self.key_prefix + key)
+
+    def clear(self):
+        self.cache.clear()
+
+
+_caches = {}
+_cache_lock = threading.Lock()
+
+
+def get_cache(name='reference'):
+    """
+    Retorna o cache configurado com esse nome (criado na primeira chamada).
+    """
+    cache = _caches.get(name)
+    if cache is None:
+        with _cache_lock:
+            cache = _caches.get(name)
+            if cache is None:
+                options = {**CACHE_DEFAULTS[name], **getattr(settings, f'APP_FF_{name.upper()}_CACHE', {})}
+                if options['BACKEND'] == 'django':
+                    cache = SharedCache(options['ALIAS'], options['TIMEOUT'], name)
+                else:
+                    cache = LocalCache(options['MAX_SIZE'], options['TIMEOUT'])
+                _caches[name] = cache
+    return cache
+
+
+def clear():
+    for name in CACHE_DEFAULTS:
+        get_cache(name).clear()
+
+
+def instance_key(model, pk):
+    return f'{model._meta.model_name}:{pk}'
+
+
+def set_on_commit(key, value, name='reference'):
+    """
+    Grava no cache só depois do commit, para nunca guardar linhas que ainda
+    podem sofrer rollback.
+    """
+    db_transaction.on_commit(lambda: get_cache(name).set(key, value))
+
+
+def invalidate(key):
+    """
+    Remove a chave agora e de novo após o commit, descartando valores gravados
+    por outras requisições enquanto a transação estava aberta.
+    """
+    get_cache().delete(key)
+    db_transaction.on_commit(lambda: get_cache().delete(key))
+
+
+def get_instance(model, pk):
+    """
+    Busca uma instância pelo pk usando o cache. Cada chamada recebe uma cópia,
+    para que alterações em uma requisição não vazem para outra.
+    """
+    key = instance_key(model, pk)
+    instance = get_cache().get(key)
+    if instance is None:
+        instance = model.objects.get(pk=pk)
+        set_on_commit(key, instance)
+    return copy.copy(instance)
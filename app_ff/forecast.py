@@ -0,0 +1,314 @@
+# Projeção do fluxo de caixa (saldo diário ou mensal) para os próximos meses.
+# Soma as despesas e receitas já postadas e ainda não concluídas com as transações
+# pendentes expandidas pelas mesmas regras de Transaction.post() (parcelas e
+# recorrências) e com as ocorrências recorrentes além da janela já gravada.
+# Com o NumPy instalado, a expansão e as somas são vetorizadas; sem ele, o mesmo
+# cálculo é feito em Python puro (mais lento, com o mesmo resultado).
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from . import cache
+from .installments import plan as plan_installments, to_cents
+from .models import Expense, Income, Transaction
+from .recurrence import add_months, occurrence_dates
+
+GRANULARITIES = ['daily', 'monthly']
+
+# Passo de cada frequência de recorrência: (meses, dias)
+FREQUENCY_STEPS = {'weekly': (0, 7), 'monthly': (1, 0), 'yearly': (12, 0)}
+
+# Ordinal de 1970-01-01 (dia zero do datetime64) e marcador de data ausente
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+NAT_ORDINAL = -1
+
+
+def format_cents(cents):
+    """
+    Valor em centavos no mesmo formato dos campos "amount" da API (ex: "-12.30").
+    """
+    return str(Decimal(int(cents)).scaleb(-2))
+
+
+# -------------------- LEITURA DOS DADOS --------------------
+
+def load_items(member=None, end=None):
+    """
+    Lê do banco (sem instanciar modelos) tudo o que entra na projeção até "end":
+    - entries: (data, centavos) das despesas/receitas não concluídas (despesas negativas)
+    - once: (data, centavos) das transações pendentes de valor único
+    - installments: (primeira data, parcelas, centavos da parcela, centavos da última) das despesas parceladas
+    - recurring: (início, frequência, depois de, fim, centavos) das despesas recorrentes
+    """
+    expenses = Expense.objects.exclude(status='cleared').filter(date__lte=end)
+    incomes = Income.objects.exclude(status='cleared').filter(date__lte=end)
+    transactions = Transaction.objects.filter(due_date__lte=end)
+    if member is not None:
+        expenses = expenses.filter(transaction__member_id=member)
+        incomes = incomes.filter(transaction__member_id=member)
+        transactions = transactions.filter(member_id=member)
+
+    entries = [(entry_date, -to_cents(amount)) for entry_date, amount in expenses.values_list('date', 'amount')]
+    entries += [(entry_date, to_cents(amount)) for entry_date, amount in incomes.values_list('date', 'amount')]
+
+    once, installments, recurring = [], [], []
+    rows = transactions.filter(status='pending').exclude(type='expense', recurrence='recurring')
+    for transaction_type, recurrence, due_date, amount, total_installments in rows.values_list(
+        'type', 'recurrence', 'due_date', 'total_amount', 'total_installments'
+    ):
+        if transaction_type == 'income':
+            once.append((due_date, to_cents(amount)))
+        elif recurrence == 'installment' and total_installments:
+            installments.append((due_date, total_installments, -to_cents(amount)))
+        else:
+            once.append((due_date, -to_cents(amount)))
+
+    # Parcelas em centavos exatos, como no post(): calculadas em lote, com o resto na última
+    bases, lasts = plan_installments([row[2] for row in installments], [row[1] for row in installments])
+    installments = [(due_date, count, base, last) for (due_date, count, _), base, last in zip(installments, bases, lasts)]
+
+    # Recorrências pendentes (todas as ocorrências) e postadas (só além da janela gravada)
+    rows = transactions.filter(type='expense', recurrence='recurring').filter(
+        Q(status='pending') | Q(materialized_until__isnull=True) | Q(materialized_until__lt=end)
+    )
+    for status, due_date, frequency, recurrence_end, materialized_until, amount in rows.values_list(
+        'status', 'due_date', 'frequency', 'recurrence_end', 'materialized_until', 'total_amount'
+    ):
+        after = materialized_until if status != 'pending' else None
+        recurring.append((due_date, frequency, after, recurrence_end, -to_cents(amount)))
+
+    return entries, once, installments, recurring
+
+
+# -------------------- PROJEÇÃO --------------------
+
+def bucket_starts(start, end, granularity):
+    """
+    Primeiro dia de cada ponto da projeção (cada dia ou cada mês de start a end).
+    """
+    if granularity == 'daily':
+        return [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    first = start.replace(day=1)
+    months = (end.year - first.year) * 12 + end.month - first.month
+    return [add_months(first, offset) for offset in range(months + 1)]
+
+
+def project_python(items, start, end, granularity):
+    """
+    Versão em Python puro: expande as ocorrências uma a uma com as funções de recurrence.
+    Retorna as listas (entradas, saídas) em centavos por ponto.
+    """
+    entries, once, installments, recurring = items
+    flows = list(entries) + list(once)
+    for first_date, count, base, last in installments:
+        flows.extend((add_months(first_date, offset), base if offset < count - 1 else last) for offset in range(count))
+    for due_date, frequency, after, recurrence_end, cents in recurring:
+        flows.extend((occurrence, cents) for occurrence in occurrence_dates(due_date, frequency, end, after=after, end=recurrence_end))
+
+    inflow, outflow = defaultdict(int), defaultdict(int)
+    for flow_date, cents in flows:
+        if flow_date > end:
+            continue
+        # Valores atrasados (antes de hoje) entram no primeiro ponto
+        flow_date = max(flow_date, start)
+        key = flow_date if granularity == 'daily' else flow_date.replace(day=1)
+        if cents >= 0:
+            inflow[key] += cents
+        else:
+            outflow[key] -= cents
+
+    keys = bucket_starts(start, end, granularity)
+    return [inflow[key] for key in keys], [outflow[key] for key in keys]
+
+
+def add_months_array(dates, index, months):
+    """
+    Versão vetorizada de recurrence.add_months: dates[index] somada a "months" meses,
+    com o dia ajustado ao último dia do mês. Mês e dia são calculados uma vez por item;
+    o primeiro dia e o tamanho de cada mês vêm de uma tabela, sem converter cada linha
+    entre unidades de calendário.
+    """
+    if not len(index):
+        return np.array([], dtype='datetime64[D]')
+    month = dates.astype('datetime64[M]')
+    day = (dates - month.astype('datetime64[D]')).astype(np.int64)
+    target = month.astype(np.int64)[index] + months
+    first = target.min()
+    table = np.arange(first, target.max() + 2).astype('datetime64[M]').astype('datetime64[D]')
+    position = target - first
+    last_day = np.diff(table).astype(np.int64)[position] - 1
+    return table[position] + np.minimum(day[index], last_day).astype('timedelta64[D]')
+
+
+def date_array(values):
+    """
+    Converte datas do Python em datetime64[D] pelo número ordinal (bem mais rápido que
+    deixar o NumPy converter cada objeto date). None vira NaT.
+    """
+    ordinals = np.fromiter((NAT_ORDINAL if value is None else value.toordinal() for value in values), np.int64)
+    days = np.where(ordinals == NAT_ORDINAL, np.iinfo(np.int64).min, ordinals - EPOCH_ORDINAL)
+    return days.astype('datetime64[D]')
+
+
+def expand(counts):
+    """
+    Para itens que geram "counts" ocorrências cada, devolve o índice do item e o
+    número da ocorrência (0, 1, 2, ...) de cada linha expandida.
+    """
+    index = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.arange(len(index)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return index, offsets
+
+
+def project_numpy(items, start, end, granularity):
+    """
+    Versão vetorizada: as ocorrências são geradas como arrays de datas e centavos e
+    somadas por ponto com bincount, sem laços por linha.
+    """
+    entries, once, installments, recurring = items
+    end_day = np.datetime64(end, 'D')
+    dates, amounts = [], []
+
+    fixed = entries + once
+    if fixed:
+        dates.append(date_array(row[0] for row in fixed))
+        amounts.append(np.fromiter((row[1] for row in fixed), np.int64))
+
+    if installments:
+        first_dates = date_array(row[0] for row in installments)
+        counts = np.array([row[1] for row in installments], dtype=np.int64)
+        index, offsets = expand(counts)
+        dates.append(add_months_array(first_dates, index, offsets))
+        bases = np.array([row[2] for row in installments], dtype=np.int64)
+        lasts = np.array([row[3] for row in installments], dtype=np.int64)
+        amounts.append(np.where(offsets == counts[index] - 1, lasts[index], bases[index]))
+
+    if recurring:
+        due_dates = date_array(row[0] for row in recurring)
+        month_steps = np.array([FREQUENCY_STEPS[row[1]][0] for row in recurring], dtype=np.int64)
+        day_steps = np.array([FREQUENCY_STEPS[row[1]][1] for row in recurring], dtype=np.int64)
+        afters = date_array(row[2] for row in recurring)
+        recurrence_ends = date_array(row[3] for row in recurring)
+        last = np.where(np.isnat(recurrence_ends), end_day, np.minimum(recurrence_ends, end_day))
+
+        # Ocorrências até o fim (uma a mais nas mensais/anuais, descartada pela máscara)
+        span_days = np.maximum((last - due_dates).astype(np.int64), -1)
+        span_months = (last.astype('datetime64[M]') - due_dates.astype('datetime64[M]')).astype(np.int64)
+        counts = np.where(day_steps > 0, span_days // np.maximum(day_steps, 1), span_months // np.maximum(month_steps, 1)) + 1
+        counts = np.maximum(counts, 0)
+
+        index, offsets = expand(counts)
+        occurrences = np.empty(len(index), dtype='datetime64[D]')
+        weekly = day_steps[index] > 0
+        occurrences[weekly] = due_dates[index[weekly]] + (offsets[weekly] * day_steps[index[weekly]]).astype('timedelta64[D]')
+        monthly = ~weekly
+        occurrences[monthly] = add_months_array(due_dates, index[monthly], offsets[monthly] * month_steps[index[monthly]])
+        after = afters[index]
+        keep = (occurrences <= last[index]) & (np.isnat(after) | (occurrences > after))
+        dates.append(occurrences[keep])
+        amounts.append(np.array([row[4] for row in recurring], dtype=np.int64)[index][keep])
+
+    keys = bucket_starts(start, end, granularity)
+    if not dates:
+        return [0] * len(keys), [0] * len(keys)
+
+    dates = np.concatenate(dates)
+    amounts = np.concatenate(amounts)
+    keep = dates <= end_day
+    dates = np.maximum(dates[keep], np.datetime64(start, 'D'))
+    amounts = amounts[keep]
+
+    if granularity == 'daily':
+        positions = (dates - np.datetime64(start, 'D')).astype(np.int64)
+    else:
+        positions = (dates.astype('datetime64[M]') - np.datetime64(start, 'M')).astype(np.int64)
+
+    # Centavos cabem exatamente no float64 do bincount (até 2^53)
+    inflow = np.bincount(positions, weights=np.where(amounts > 0, amounts, 0), minlength=len(keys))
+    outflow = np.bincount(positions, weights=np.where(amounts < 0, -amounts, 0), minlength=len(keys))
+    return np.rint(inflow).astype(np.int64).tolist(), np.rint(outflow).astype(np.int64).tolist()
+
+
+def project(member=None, months=12, granularity='monthly', opening_balance=Decimal('0'), start=None):
+    """
+    Projeta o saldo de hoje (ou "start") até "months" meses à frente, por dia ou por mês.
+    O saldo de cada ponto é o saldo inicial somado às entradas e saídas acumuladas.
+    """
+    start = start or timezone.localdate()
+    end = add_months(start, months)
+    items = load_items(member, end)
+    engine = project_numpy if np is not None else project_python
+    inflow, outflow = engine(items, start, end, granularity)
+
+    balance = to_cents(opening_balance)
+    points = []
+    for key, income, expense in zip(bucket_starts(start, end, granularity), inflow, outflow):
+        balance += income - expense
+        points.append({
+            'date': key,
+            'income': format_cents(income),
+            'expense': format_cents(expense),
+            'balance': format_cents(balance),
+        })
+    return {
+        'member': member,
+        'granularity': granularity,
+        'start': start,
+        'end': end,
+        'opening_balance': format_cents(to_cents(opening_balance)),
+        'points': points,
+    }
+
+
+# -------------------- CACHE --------------------
+
+def data_version(member=None):
+    """
+    Versão dos dados que entram na projeção: contagem e maior updated_at das transações,
+    despesas e receitas (do membro, se informado). Qualquer alteração muda a versão.
+    """
+    querysets = [Transaction.objects.all(), Expense.objects.all(), Income.objects.all()]
+    if member is not None:
+        querysets = [querysets[0].filter(member_id=member)] + [
+            queryset.filter(transaction__member_id=member) for queryset in querysets[1:]
+        ]
+    parts = []
+    for queryset in querysets:
+        state = queryset.aggregate(count=Count('pk'), updated_at=Max('updated_at'))
+        parts.append(f"{state['count']}-{state['updated_at'].timestamp() if state['updated_at'] else 0}")
+    return ':'.join(parts)
+
+
+def cached_projection(member=None, months=12, granularity='monthly', opening_balance=Decimal('0')):
+    """
+    Projeção guardada no cache "forecast" por membro e parâmetros. A chave inclui a data
+    de hoje e a versão dos dados, então qualquer alteração gera uma nova projeção. O saldo
+    inicial fica fora da chave: ele só desloca o saldo de cada ponto e é somado depois.
+    """
+    start = timezone.localdate()
+    key = f"forecast:{member or 'all'}:{start}:{months}:{granularity}:{data_version(member)}"
+    result = cache.get_cache('forecast').get(key)
+    if result is None:
+        result = project(member, months, granularity, start=start)
+        cache.set_on_commit(key, result, 'forecast')
+    return with_opening_balance(result, opening_balance)
+
+
+def with_opening_balance(result, opening_balance):
+    """
+    Cópia de uma projeção feita com saldo inicial zero, com o saldo inicial informado.
+    """
+    opening = to_cents(opening_balance)
+    return {
+        **result,
+        'opening_balance': format_cents(opening),
+        'points': [{**point, 'balance': format_cents(to_cents(Decimal(point['balance'])) + opening)} for point in result['points']],
+    }
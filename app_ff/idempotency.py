@@ -0,0 +1,96 @@
+# Idempotency-Key nas ações síncronas que gravam dados (postagem e conclusões): a ação e
+# o registro da chave com a resposta são gravados na mesma transação. Uma nova tentativa
+# com a mesma chave devolve a resposta guardada sem executar nada; se a primeira ainda
+# estiver em andamento, a segunda espera o lock da chave (índice único) e depois devolve
+# a mesma resposta. Nas requisições com "Prefer: respond-async" a chave vai para a tarefa
+# (ver BackgroundJobMixin).
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction as db_transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+# Horas em que uma chave continua valendo (APP_FF_IDEMPOTENCY_TTL_HOURS no settings)
+DEFAULT_TTL_HOURS = 24
+
+# Cabeçalho que marca as respostas repetidas
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+
+def get_ttl():
+    return timedelta(hours=getattr(settings, 'APP_FF_IDEMPOTENCY_TTL_HOURS', DEFAULT_TTL_HOURS))
+
+
+def purge_expired():
+    """
+    Remove as chaves vencidas, que de outra forma só seriam apagadas quando o cliente
+    repetisse a mesma chave (comando purge_idempotency_keys). Retorna quantas removeu.
+    """
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=timezone.now() - get_ttl()).delete()
+    return deleted
+
+
+def fingerprint(request):
+    """
+    Hash do método, do caminho e do corpo da requisição, para detectar a mesma chave
+    usada em outra requisição.
+    """
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(f'{request.method} {request.path}\n{body}'.encode()).hexdigest()
+
+
+def replay(record, request_fingerprint):
+    if record.fingerprint != request_fingerprint:
+        return Response({'error': 'Idempotency-Key already used for a different request'}, status=status.HTTP_409_CONFLICT)
+    response = Response(record.response, status=record.status_code)
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def idempotent(view_method):
+    """
+    Decorator das ações dos viewsets: com o header Idempotency-Key, executa a ação uma
+    única vez por chave. Respostas 5xx (e exceções) desfazem tudo, inclusive a chave,
+    para que a nova tentativa execute de novo.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key or 'respond-async' in request.headers.get('Prefer', ''):
+            return view_method(self, request, *args, **kwargs)
+
+        request_fingerprint = fingerprint(request)
+        record = IdempotencyKey.objects.filter(key=key).first()
+        if record is not None:
+            if record.created_at >= timezone.now() - get_ttl():
+                return replay(record, request_fingerprint)
+            record.delete()  # Chave vencida: vale como nova
+
+        try:
+            with db_transaction.atomic():
+                # Grava a chave primeiro: uma requisição concorrente com a mesma chave fica
+                # bloqueada no índice único até este commit (ou rollback)
+                record = IdempotencyKey.objects.create(key=key, fingerprint=request_fingerprint, status_code=0)
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code >= 500:
+                    db_transaction.set_rollback(True)
+                    return response
+                record.status_code = response.status_code
+                record.response = response.data
+                record.save(update_fields=['status_code', 'response'])
+        except IntegrityError:
+            # A outra requisição terminou primeiro; se o erro veio da própria ação, a chave não existe
+            record = IdempotencyKey.objects.filter(key=key).first()
+            if record is None:
+                raise
+            return replay(record, request_fingerprint)
+        return response
+    return wrapper
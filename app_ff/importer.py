@@ -0,0 +1,142 @@
+import csv
+import re
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from rest_framework import serializers
+
+from .models import BULK_BATCH_SIZE, FamilyMember, Tag, Transaction
+from .views import TransactionSerializer
+
+# Formatos de arquivo aceitos pelo importador
+IMPORT_FORMATS = ['csv', 'ofx']
+
+# Colunas lidas do CSV (mesmos nomes dos campos da API)
+CSV_FIELDS = ['due_date', 'description', 'total_amount', 'type', 'recurrence', 'total_installments', 'member', 'tag']
+
+# Tags do OFX no formato <TAG>valor (SGML do OFX 1.x ou XML do OFX 2.x)
+OFX_TAG = re.compile(r'<(/?)([A-Z0-9.]+)>([^<\r\n]*)')
+
+
+# -------------------- LEITURA DOS ARQUIVOS --------------------
+
+def parse_csv(stream):
+    """
+    Lê um CSV linha a linha e gera um dicionário por linha, sem as colunas vazias.
+    """
+    for row in csv.DictReader(stream):
+        yield {field: row[field].strip() for field in CSV_FIELDS if row.get(field) not in (None, '')}
+
+
+def parse_ofx(stream, member=None):
+    """
+    Lê um extrato OFX linha a linha e gera um dicionário por <STMTTRN>.
+    Débitos viram despesas e créditos viram receitas.
+    """
+    current = None
+    for line in stream:
+        for closing, tag, value in OFX_TAG.findall(line):
+            if tag == 'STMTTRN':
+                if closing and current is not None:
+                    yield ofx_row(current, member)
+                current = None if closing else {}
+            elif current is not None and not closing:
+                current[tag] = value.strip()
+
+
+def ofx_row(data, member):
+    row = {'description': data.get('NAME') or data.get('MEMO') or '', 'recurrence': 'one_time'}
+    if member is not None:
+        row['member'] = member
+    posted = data.get('DTPOSTED', '')
+    if len(posted) >= 8:
+        row['due_date'] = f"{posted[0:4]}-{posted[4:6]}-{posted[6:8]}"
+    try:
+        amount = Decimal(data.get('TRNAMT', ''))
+    except InvalidOperation:
+        row['total_amount'] = data.get('TRNAMT', '')
+    else:
+        row['total_amount'] = str(abs(amount))
+        row['type'] = 'expense' if amount < 0 else 'income'
+    return row
+
+
+# -------------------- VALIDAÇÃO --------------------
+
+# Campo relacionado resolvido por um mapa pré-carregado (id ou nome), sem consultas por linha
+class MappedRelatedField(serializers.RelatedField):
+    default_error_messages = {
+        'does_not_exist': 'Invalid "{value}" - object does not exist.',
+    }
+
+    def __init__(self, map_name, **kwargs):
+        self.map_name = map_name
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        key = str(data).strip().lower()
+        mapping = self.context[self.map_name]
+        instance = mapping.get(key) or mapping.get((key, self.parent.initial_data.get('type')))
+        if instance is None:
+            self.fail('does_not_exist', value=data)
+        return instance
+
+    def to_representation(self, value):
+        return value.pk
+
+
+# Serializer de importação: mesmas regras do TransactionSerializer, mas membro e tag
+# podem ser informados pelo id ou pelo nome e vêm de mapas carregados uma única vez
+class TransactionImportSerializer(TransactionSerializer):
+    member = MappedRelatedField('members', queryset=FamilyMember.objects.all())
+    tag = MappedRelatedField('tags', queryset=Tag.objects.all(), required=False)
+
+
+def load_reference_maps():
+    """
+    Carrega todos os membros e tags em memória, indexados por id e por nome.
+    Tags são indexadas por (nome, tipo), pois o mesmo nome pode existir nos dois tipos.
+    """
+    members = {}
+    for member in FamilyMember.objects.all():
+        members[str(member.pk)] = member
+        members.setdefault(member.name.lower(), member)
+    tags = {}
+    for tag in Tag.objects.all():
+        tags[str(tag.pk)] = tag
+        tags.setdefault((tag.name.lower(), tag.type), tag)
+    return {'members': members, 'tags': tags}
+
+
+# -------------------- IMPORTAÇÃO --------------------
+
+def import_transactions(rows, batch_size=BULK_BATCH_SIZE, on_error=None):
+    """
+    Valida e grava as linhas em lotes de tamanho fixo com bulk_create.
+    Linhas inválidas não interrompem a importação: são repassadas para
+    on_error(numero_da_linha, erros). Retorna {'created': n, 'failed': n}.
+    """
+    context = load_reference_maps()
+    created = 0
+    failed = 0
+    rows = enumerate(rows, start=1)
+
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            break
+
+        transactions = []
+        for number, row in chunk:
+            serializer = TransactionImportSerializer(data=row, context=context)
+            if serializer.is_valid():
+                transactions.append(Transaction(**serializer.validated_data))
+            else:
+                failed += 1
+                if on_error is not None:
+                    on_error(number, serializer.errors)
+
+        Transaction.objects.bulk_create(transactions, batch_size=batch_size)
+        created += len(transactions)
+
+    return {'created': created, 'failed': failed}
@@ -0,0 +1,47 @@
+# Divisão de despesas parceladas em centavos exatos: todas as parcelas recebem o valor
+# truncado da divisão e a última recebe o resto, então a soma das parcelas é sempre igual
+# ao total da transação. Usado pelo post()/post_many (gravação) e pela projeção.
+# Com o NumPy instalado, um lote inteiro de transações é dividido de uma vez.
+from decimal import Decimal
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def to_cents(amount):
+    return int(amount * 100)
+
+
+def from_cents(cents):
+    """
+    Centavos para Decimal com duas casas (ex: 3334 -> Decimal('33.34')).
+    """
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def split(total, count):
+    """
+    Divide "total" centavos em "count" parcelas e retorna (parcela, última parcela).
+    A divisão é truncada em direção a zero, para que o resto tenha o mesmo sinal do total.
+    """
+    base = abs(total) // count
+    base = base if total >= 0 else -base
+    return base, total - base * (count - 1)
+
+
+def plan(totals, counts):
+    """
+    Versão em lote de split(): recebe os totais (centavos) e as quantidades de parcelas
+    e retorna as listas (parcelas, últimas parcelas), vetorizada quando há NumPy.
+    """
+    if np is None:
+        pairs = [split(total, count) for total, count in zip(totals, counts)]
+        return [base for base, _ in pairs], [last for _, last in pairs]
+
+    totals = np.asarray(totals, dtype=np.int64)
+    counts = np.asarray(counts, dtype=np.int64)
+    bases = np.sign(totals) * (np.abs(totals) // np.maximum(counts, 1))
+    lasts = totals - bases * (counts - 1)
+    return bases.tolist(), lasts.tolist()
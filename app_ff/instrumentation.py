@@ -0,0 +1,183 @@
+# Instrumentação de desempenho por requisição: tempo total, quantidade e tempo de
+# consultas ao banco e tempo de serialização. Os valores vão para o cabeçalho
+# Server-Timing e para histogramas no formato Prometheus (em /api/metrics/).
+# As métricas ficam na memória de cada processo.
+import bisect
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+
+slow_query_logger = logging.getLogger('app_ff.slow_queries')
+
+# Métricas da requisição em andamento (None fora de requisições, ex: comandos)
+current_metrics = contextvars.ContextVar('app_ff_request_metrics', default=None)
+
+# Limites dos buckets dos histogramas
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+
+# Valores medidos durante uma requisição
+class RequestMetrics:
+    __slots__ = ('queries', 'db_time', 'serialization_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialization_time = 0.0
+
+
+# Histograma acumulado (contagem por bucket, soma e total), seguro entre threads
+class Histogram:
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self.series.get(labels) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self.series[labels] = (counts, total + value)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {labels: (list(counts), total) for labels, (counts, total) in self.series.items()}
+        for labels, (counts, total) in sorted(series.items()):
+            label_text = ','.join(f'{key}="{value}"' for key, value in labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {total}')
+            lines.append(f'{self.name}_count{{{label_text}}} {cumulative}')
+        return '\n'.join(lines)
+
+
+REQUEST_DURATION = Histogram('app_ff_request_duration_seconds', 'Total request latency.', SECONDS_BUCKETS)
+DB_DURATION = Histogram('app_ff_db_duration_seconds', 'Time spent in database queries per request.', SECONDS_BUCKETS)
+DB_QUERIES = Histogram('app_ff_db_queries', 'Database queries per request.', QUERY_COUNT_BUCKETS)
+SERIALIZATION_DURATION = Histogram('app_ff_serialization_duration_seconds', 'Time spent serializing per request.', SECONDS_BUCKETS)
+HISTOGRAMS = [REQUEST_DURATION, DB_DURATION, DB_QUERIES, SERIALIZATION_DURATION]
+
+
+def time_query(execute, sql, params, many, context):
+    """
+    Execute wrapper instalado em toda conexão: soma as consultas na requisição atual
+    e registra no log as consultas acima de APP_FF_SLOW_QUERY_MS (se configurado).
+    """
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.queries += 1
+            metrics.db_time += elapsed
+        threshold = getattr(settings, 'APP_FF_SLOW_QUERY_MS', None)
+        if threshold is not None and elapsed * 1000 >= threshold:
+            slow_query_logger.warning('Slow query (%.1f ms): %s', elapsed * 1000, sql)
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+# Middleware que mede cada requisição, grava os histogramas e adiciona o Server-Timing
+class PerformanceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics, time.perf_counter() - started)
+
+    def finish(self, request, response, metrics, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unmatched'
+        labels = (('view', view), ('method', request.method))
+
+        REQUEST_DURATION.observe(labels, elapsed)
+        DB_DURATION.observe(labels, metrics.db_time)
+        DB_QUERIES.observe(labels, metrics.queries)
+        SERIALIZATION_DURATION.observe(labels, metrics.serialization_time)
+
+        if getattr(settings, 'APP_FF_SERVER_TIMING', True):
+            response['Server-Timing'] = (
+                f'db;dur={metrics.db_time * 1000:.2f};desc="{metrics.queries} queries", '
+                f'ser;dur={metrics.serialization_time * 1000:.2f}, '
+                f'total;dur={elapsed * 1000:.2f}'
+            )
+        return response
+
+
+@contextlib.contextmanager
+def measure_serialization():
+    """
+    Soma o tempo do bloco à serialização da requisição atual (se houver).
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.serialization_time += time.perf_counter() - started
+
+
+# Mixin dos viewsets do DRF que mede a serialização das respostas de leitura
+class InstrumentedViewMixin:
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        # Só serializers de leitura (com instância e sem dados de entrada); o resultado
+        # fica em cache no próprio serializer, então a view não serializa de novo
+        if current_metrics.get() is not None and args and 'data' not in kwargs:
+            with measure_serialization():
+                serializer.data
+        return serializer
+
+
+def metrics_view(request):
+    """
+    Exposição das métricas no formato texto do Prometheus.
+    """
+    body = '\n'.join(histogram.render() for histogram in HISTOGRAMS) + '\n'
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
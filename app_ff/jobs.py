@@ -0,0 +1,262 @@
+# Fila de tarefas em segundo plano guardada no próprio banco (modelo Job), sem broker
+# externo. As views enfileiram (enqueue) e o comando run_workers executa: cada worker
+# pega uma tarefa por vez (claim) com um UPDATE condicional, então vários workers (em
+# threads ou processos) podem disputar a mesma fila sem executar a mesma tarefa duas vezes.
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist, ValidationError as DjangoValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, IntegrityError, close_old_connections, connection, transaction as db_transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from . import idempotency
+from .models import Expense, Income, Job, MonthlyRollup, Transaction, clear_entries
+
+# Valores padrão, que podem ser sobrescritos no settings
+DEFAULT_MAX_ATTEMPTS = 3     # APP_FF_JOB_MAX_ATTEMPTS
+DEFAULT_RETRY_DELAY = 5      # APP_FF_JOB_RETRY_DELAY: segundos até a 2ª tentativa (dobra a cada nova)
+DEFAULT_TIMEOUT = 600        # APP_FF_JOB_TIMEOUT: segundos até uma tarefa "running" ser considerada abandonada
+DEFAULT_MAX_BACKOFF = 60     # APP_FF_JOB_MAX_BACKOFF: espera máxima (segundos) do worker após erros seguidos do banco
+
+# Erros que não adianta tentar de novo: a tarefa falha na hora
+PERMANENT_ERRORS = (ObjectDoesNotExist, ValidationError, DjangoValidationError, LookupError)
+
+logger = logging.getLogger('app_ff.jobs')
+
+# Handlers registrados por tipo de tarefa
+JOB_HANDLERS = {}
+
+# Modelos aceitos pela conclusão em lote
+ENTRY_MODELS = {'expense': Expense, 'income': Income}
+
+
+# Idempotency-Key já usada por uma tarefa de outro tipo ou com outros parâmetros
+class IdempotencyConflict(Exception):
+    pass
+
+
+def job_handler(kind):
+    """
+    Registra a função como handler das tarefas do tipo "kind". O handler recebe o
+    payload e retorna o resultado (precisa ser serializável em JSON).
+    """
+    def register(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return register
+
+
+def get_setting(name, default):
+    return getattr(settings, f'APP_FF_JOB_{name}', default)
+
+
+# -------------------- HANDLERS --------------------
+
+@job_handler('post_transaction')
+def post_transaction(payload):
+    # post_many bloqueia a linha e só posta se ainda estiver pendente, então uma
+    # tarefa repetida (ou concorrente) não duplica as despesas/receitas
+    if not Transaction.objects.filter(pk=payload['id']).exists():
+        raise Transaction.DoesNotExist(f"Transaction {payload['id']} not found")
+    posted = Transaction.post_many(Transaction.objects.filter(pk=payload['id']))
+    return {'id': payload['id'], 'result': 'posted' if posted else 'not_pending'}
+
+
+@job_handler('post_batch')
+def post_batch(payload):
+    # Importação local: views importa este módulo para enfileirar
+    from .views import TransactionBatchSerializer, post_transactions
+
+    serializer = TransactionBatchSerializer(data=payload)
+    serializer.is_valid(raise_exception=True)
+    return post_transactions(serializer)
+
+
+@job_handler('clear_batch')
+def clear_batch(payload):
+    from .views import EntryBatchSerializer
+
+    serializer = EntryBatchSerializer(data=payload['filters'])
+    serializer.is_valid(raise_exception=True)
+    return {'cleared': clear_entries(serializer.filter_queryset(ENTRY_MODELS[payload['model']].objects.all()))}
+
+
+@job_handler('rebuild_rollups')
+def rebuild_rollups(payload):
+    return {'rows': MonthlyRollup.rebuild()}
+
+
+@job_handler('materialize_recurrences')
+def materialize_recurrences(payload):
+    until = payload.get('until')
+    return {'created': Transaction.materialize_recurrences(until=until and date.fromisoformat(until))}
+
+
+@job_handler('purge_idempotency_keys')
+def purge_idempotency_keys(payload):
+    return {'deleted': idempotency.purge_expired()}
+
+
+# -------------------- FILA --------------------
+
+def enqueue(kind, payload=None, idempotency_key=None):
+    """
+    Enfileira uma tarefa e retorna (job, created). Com idempotency_key, um novo pedido
+    com a mesma chave devolve a tarefa já existente (created=False); se o tipo ou os
+    parâmetros forem diferentes, levanta IdempotencyConflict.
+    """
+    if kind not in JOB_HANDLERS:
+        raise LookupError(f"Unknown job kind: {kind}")
+    # Normaliza o payload como ele volta do banco (datas e UUIDs viram texto)
+    payload = json.loads(json.dumps(payload or {}, cls=DjangoJSONEncoder))
+
+    if idempotency_key:
+        existing = Job.objects.filter(idempotency_key=idempotency_key).first()
+        if existing is not None:
+            return check_idempotent(existing, kind, payload), False
+    try:
+        with db_transaction.atomic():
+            job = Job.objects.create(
+                kind=kind, payload=payload, idempotency_key=idempotency_key or None,
+                max_attempts=get_setting('MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS),
+            )
+    except IntegrityError:
+        # Outra requisição com a mesma chave gravou primeiro
+        if not idempotency_key:
+            raise
+        return check_idempotent(Job.objects.get(idempotency_key=idempotency_key), kind, payload), False
+    return job, True
+
+
+def check_idempotent(job, kind, payload):
+    if job.kind != kind or job.payload != payload:
+        raise IdempotencyConflict(job.idempotency_key)
+    return job
+
+
+def claim(worker):
+    """
+    Pega a próxima tarefa pronta (na fila e com run_after vencido, ou "running" há mais
+    de APP_FF_JOB_TIMEOUT segundos, cujo worker morreu) e a marca como "running".
+    No PostgreSQL os candidatos são lidos com SKIP LOCKED; em qualquer banco, o UPDATE
+    condicional garante que só um worker fica com a tarefa. Retorna None se não houver.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=get_setting('TIMEOUT', DEFAULT_TIMEOUT))
+    ready = Q(status='queued', run_after__lte=now) | Q(status='running', started_at__lt=stale)
+    with db_transaction.atomic():
+        candidates = list(
+            Job.objects.select_for_update(skip_locked=True).filter(ready)
+            .order_by('run_after', 'created_at').values_list('pk', 'status', 'attempts')[:10]
+        )
+        for pk, status, attempts in candidates:
+            claimed = Job.objects.filter(pk=pk, status=status, attempts=attempts).update(
+                status='running', worker=worker, attempts=F('attempts') + 1, started_at=now, updated_at=now,
+            )
+            if claimed:
+                return Job.objects.get(pk=pk)
+    return None
+
+
+def finish(job, **fields):
+    """
+    Grava o desfecho da tentativa, desde que a tarefa ainda seja deste worker (uma
+    tarefa abandonada pode ter sido pega por outro). Retorna se gravou.
+    """
+    fields['updated_at'] = timezone.now()
+    updated = Job.objects.filter(pk=job.pk, worker=job.worker, attempts=job.attempts).update(**fields)
+    for name, value in fields.items():
+        setattr(job, name, value)
+    return bool(updated)
+
+
+def run(job):
+    """
+    Executa uma tarefa já pega por claim(). Em caso de erro, volta para a fila com
+    espera exponencial até max_attempts; erros permanentes falham na primeira vez.
+    """
+    now = timezone.now()
+    if job.attempts > job.max_attempts:
+        return finish(job, status='failed', error='Timed out', finished_at=now)
+
+    try:
+        handler = JOB_HANDLERS.get(job.kind)
+        if handler is None:
+            raise LookupError(f"Unknown job kind: {job.kind}")
+        result = handler(job.payload)
+    except Exception as error:
+        message = ''.join(traceback.format_exception_only(error)).strip()
+        if isinstance(error, PERMANENT_ERRORS) or job.attempts >= job.max_attempts:
+            return finish(job, status='failed', error=message, finished_at=timezone.now())
+        delay = get_setting('RETRY_DELAY', DEFAULT_RETRY_DELAY) * 2 ** (job.attempts - 1)
+        return finish(job, status='queued', error=message, run_after=timezone.now() + timedelta(seconds=delay))
+    return finish(job, status='succeeded', result=result, error='', finished_at=timezone.now())
+
+
+def default_worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def work(worker=None, burst=False, poll_interval=1.0, stop=None):
+    """
+    Laço de um worker: pega e executa tarefas até "stop" (threading.Event) ser
+    acionado. Com burst, para assim que a fila não tiver tarefas prontas.
+    Erros do banco ao pegar ou gravar uma tarefa (banco fora do ar, "database is
+    locked") são registrados no log e o worker fecha a conexão e tenta de novo com uma
+    nova, esperando o dobro a cada erro seguido (até APP_FF_JOB_MAX_BACKOFF segundos);
+    uma tarefa que não pôde ser gravada volta para a fila pelo timeout. A cada volta,
+    as conexões quebradas ou mais velhas que CONN_MAX_AGE são fechadas, como o Django
+    faz a cada requisição. Retorna quantas tarefas executou.
+    """
+    worker = worker or default_worker_name()
+    max_backoff = get_setting('MAX_BACKOFF', DEFAULT_MAX_BACKOFF)
+
+    def pause(seconds):
+        if stop is not None:
+            stop.wait(seconds)
+        else:
+            time.sleep(seconds)
+
+    def reconnect(force=False):
+        # Dentro de uma transação do chamador (ex: testes) a conexão não pode ser trocada
+        if connection.in_atomic_block:
+            return
+        if force:
+            connection.close()
+        else:
+            close_old_connections()
+
+    processed = 0
+    errors = 0
+    while stop is None or not stop.is_set():
+        reconnect()
+        try:
+            job = claim(worker)
+            if job is not None:
+                run(job)
+        except DatabaseError:
+            errors += 1
+            delay = min(poll_interval * 2 ** (errors - 1), max_backoff)
+            logger.exception("Worker %s: database error, retrying in %.1f s", worker, delay)
+            # A conexão pode ter caído: a próxima consulta abre outra
+            reconnect(force=True)
+            pause(delay)
+            continue
+        errors = 0
+        if job is None:
+            if burst:
+                break
+            pause(poll_interval)
+            continue
+        processed += 1
+    return processed
@@ -0,0 +1,96 @@
+import json
+import platform
+import subprocess
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from app_ff import cache
+from app_ff.benchmarks import BENCHMARKS
+from app_ff.seed import generate
+
+
+class Command(BaseCommand):
+    help = (
+        "Roda a suíte de benchmarks (postagem, listagens, agregações e conclusão) num banco de "
+        "teste descartável, populado pelo gerador de dados sintéticos, e mostra o resultado em "
+        "JSON. Use --output para gravar o arquivo e --compare para comparar com outro commit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transactions', type=int, default=2000, help="Transações geradas pelo seed")
+        parser.add_argument('--members', type=int, default=5)
+        parser.add_argument('--tags', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=5, help="Execuções de cada caso")
+        parser.add_argument('--filter', help="Só os casos cujo nome começa com este prefixo")
+        parser.add_argument('--output', help="Grava o JSON neste arquivo")
+        parser.add_argument('--compare', help="JSON de uma execução anterior para comparar")
+
+    def handle(self, *args, **options):
+        benchmarks = [item for item in BENCHMARKS if not options['filter'] or item.name.startswith(options['filter'])]
+        if not benchmarks:
+            raise CommandError(f"No benchmark matches {options['filter']!r}.")
+
+        baseline = self.load_baseline(options['compare']) if options['compare'] else {}
+
+        # DEBUG desligado (como em produção) para não guardar as consultas em connection.queries
+        setup_test_environment(debug=False)
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            cache.clear()
+            generate(options['members'], options['tags'], options['transactions'], options['seed'])
+            results = []
+            for item in benchmarks:
+                result = item.run(options['repeat'])
+                previous = baseline.get(self.result_key(result))
+                if previous:
+                    result['change'] = round(result['min_ms'] / previous['min_ms'] - 1, 3)
+                results.append(result)
+                self.stderr.write(f"{result['name']} {result['params']}: {result['min_ms']} ms")
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = json.dumps({'environment': self.environment(options), 'results': results}, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(report + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}."))
+        else:
+            self.stdout.write(report)
+
+    @staticmethod
+    def result_key(result):
+        return result['name'], json.dumps(result['params'], sort_keys=True)
+
+    def load_baseline(self, path):
+        try:
+            with open(path) as file:
+                return {self.result_key(result): result for result in json.load(file)['results']}
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f"{path}: {error}")
+
+    @staticmethod
+    def environment(options):
+        """
+        Dados da execução, para comparar resultados entre commits e máquinas.
+        """
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'commit': commit,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'transactions': options['transactions'],
+            'seed': options['seed'],
+            'repeat': options['repeat'],
+        }
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app_ff.models import MemberBalance
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula os saldos dos membros (MemberBalance) a partir das transações pendentes e das "
+        "despesas e receitas e "
+        "mostra as diferenças em relação aos gravados. Com --fix, regrava todos os saldos "
+        "(necessário uma vez em bancos com lançamentos anteriores à criação da tabela)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help="Regrava os saldos a partir dos lançamentos")
+
+    def handle(self, *args, **options):
+        differences = MemberBalance.drift()
+        for member_id, field, stored, expected in differences:
+            self.stdout.write(f"{member_id} {field}: stored {stored}, expected {expected}")
+
+        if options['fix']:
+            created = MemberBalance.rebuild()
+            self.stdout.write(self.style.SUCCESS(f"Member balances rebuilt: {created} rows."))
+        elif differences:
+            raise CommandError(f"Found {len(differences)} drifted balances; run with --fix to rebuild.")
+        else:
+            self.stdout.write(self.style.SUCCESS("Member balances are consistent."))
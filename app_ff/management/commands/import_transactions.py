@@ -0,0 +1,34 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app_ff.importer import IMPORT_FORMATS, import_transactions, parse_csv, parse_ofx
+from app_ff.models import BULK_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Importa transações de um arquivo CSV ou OFX em lotes, reportando as linhas inválidas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Caminho do arquivo a importar")
+        parser.add_argument('--format', choices=IMPORT_FORMATS, default='csv')
+        parser.add_argument('--member', help="Membro (id ou nome) usado nas linhas do OFX")
+        parser.add_argument('--batch-size', type=int, default=BULK_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        def on_error(row, errors):
+            self.stderr.write(f"Row {row}: {json.dumps(errors)}")
+
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                if options['format'] == 'csv':
+                    rows = parse_csv(stream)
+                else:
+                    rows = parse_ofx(stream, member=options['member'])
+                result = import_transactions(rows, batch_size=options['batch_size'], on_error=on_error)
+        except OSError as error:
+            raise CommandError(error)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['created']} transactions, {result['failed']} rows failed."
+        ))
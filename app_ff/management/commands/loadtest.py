@@ -0,0 +1,68 @@
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Caminhos medidos por padrão: a versão síncrona (DRF/WSGI) e a assíncrona (ASGI) de cada leitura
+DEFAULT_PATHS = [
+    '/api/transactions/', '/api/async/transactions/',
+    '/api/expenses/', '/api/async/expenses/',
+    '/api/incomes/', '/api/async/incomes/',
+    '/api/summary/', '/api/async/summary/',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Dispara requisições concorrentes contra um servidor em execução e mostra, em JSON, "
+        "requisições/s e latências (p50/p99) por caminho. Rode uma vez contra o servidor WSGI "
+        "(ex: gunicorn) e outra contra o ASGI (ex: uvicorn) com a mesma concorrência."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help="Endereço base do servidor")
+        parser.add_argument('--path', action='append', dest='paths', help="Caminho a medir (pode repetir)")
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--requests', type=int, default=500, help="Requisições por caminho")
+
+    def handle(self, *args, **options):
+        results = []
+        for path in options['paths'] or DEFAULT_PATHS:
+            results.append(self.run(options['url'].rstrip('/') + path, options['concurrency'], options['requests']))
+            results[-1]['path'] = path
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def run(self, url, concurrency, total):
+        def fetch(_):
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(url) as response:
+                    response.read()
+                    ok = response.status < 400
+            except (urllib.error.URLError, ConnectionError):
+                ok = False
+            return time.perf_counter() - started, ok
+
+        try:
+            urllib.request.urlopen(url).read()  # Aquecimento e verificação do servidor
+        except urllib.error.URLError as error:
+            raise CommandError(f"{url}: {error}")
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            samples = list(executor.map(fetch, range(total)))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for latency, _ in samples)
+        return {
+            'concurrency': concurrency,
+            'requests': total,
+            'errors': sum(1 for _, ok in samples if not ok),
+            'requests_per_second': round(total / elapsed, 1),
+            'p50_ms': round(statistics.median(latencies) * 1000, 2),
+            'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 2),
+        }
@@ -0,0 +1,22 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from app_ff import jobs
+from app_ff.models import Transaction
+
+
+class Command(BaseCommand):
+    help = "Grava as ocorrências das despesas recorrentes até o fim da janela (rodar periodicamente)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--until', type=date.fromisoformat, help="Data final (AAAA-MM-DD); padrão: fim da janela a partir de hoje")
+        parser.add_argument('--enqueue', action='store_true', help="Enfileira a tarefa para o run_workers")
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            job, _ = jobs.enqueue('materialize_recurrences', {'until': options['until']})
+            self.stdout.write(self.style.SUCCESS(f"Enqueued job {job.pk}."))
+            return
+        created = Transaction.materialize_recurrences(until=options['until'])
+        self.stdout.write(self.style.SUCCESS(f"Materialized {created} recurring expenses."))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from app_ff import idempotency, jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Remove as Idempotency-Keys mais velhas que APP_FF_IDEMPOTENCY_TTL_HOURS "
+        "(rodar periodicamente, para que a tabela não cresça sem limite)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--enqueue', action='store_true', help="Enfileira a tarefa para o run_workers")
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            job, _ = jobs.enqueue('purge_idempotency_keys')
+            self.stdout.write(self.style.SUCCESS(f"Enqueued job {job.pk}."))
+            return
+        deleted = idempotency.purge_expired()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired idempotency keys."))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from app_ff import jobs
+from app_ff.models import MonthlyRollup
+
+
+class Command(BaseCommand):
+    help = "Recalcula do zero o resumo mensal (MonthlyRollup) a partir das despesas e receitas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--enqueue', action='store_true', help="Enfileira o recálculo para o run_workers")
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            job, _ = jobs.enqueue('rebuild_rollups')
+            self.stdout.write(self.style.SUCCESS(f"Enqueued job {job.pk}."))
+            return
+        created = MonthlyRollup.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Monthly rollup rebuilt: {created} rows."))
@@ -0,0 +1,51 @@
+import signal
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from app_ff import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Executa as tarefas em segundo plano (posting, conclusão em lote, recálculos) com um pool "
+        "de threads. Pode rodar em vários processos ou máquinas ao mesmo tempo: cada tarefa é "
+        "pega por um único worker. Com --burst, termina quando a fila estiver vazia."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Threads executando tarefas")
+        parser.add_argument('--burst', action='store_true', help="Sai quando não houver tarefas prontas")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Segundos entre consultas à fila vazia")
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+
+        def worker(index):
+            try:
+                return jobs.work(
+                    f'{jobs.default_worker_name()}:{index}', burst=options['burst'],
+                    poll_interval=options['poll_interval'], stop=stop,
+                )
+            finally:
+                # Cada thread tem a sua conexão com o banco
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            futures = [executor.submit(worker, index) for index in range(options['workers'])]
+            try:
+                # Espera até todos terminarem (--burst, SIGTERM) ou o primeiro falhar
+                wait(futures, return_when=FIRST_EXCEPTION)
+            except KeyboardInterrupt:
+                # Termina as tarefas em andamento antes de sair
+                pass
+            finally:
+                # Se um worker falhar, os outros também param: sem isso o "with" esperaria
+                # para sempre pelas threads que ainda estão no laço
+                stop.set()
+            processed = sum(future.result() for future in futures)
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} jobs."))
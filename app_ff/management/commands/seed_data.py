@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from app_ff.models import Expense, Income
+from app_ff.seed import generate
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera dados sintéticos no banco configurado: membros, tags e transações de todos os "
+        "tipos de recorrência, que em seguida são postadas. O mesmo --seed gera os mesmos dados."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=5)
+        parser.add_argument('--tags', type=int, default=10)
+        parser.add_argument('--transactions', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--no-post', action='store_true', help="Deixa as transações pendentes")
+
+    def handle(self, *args, **options):
+        transactions = generate(
+            members=options['members'],
+            tags=options['tags'],
+            transactions=options['transactions'],
+            seed=options['seed'],
+            post=not options['no_post'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {options['members']} members, {options['tags']} tags and {len(transactions)} transactions "
+            f"({Expense.objects.count()} expenses, {Income.objects.count()} incomes in the database)."
+        ))
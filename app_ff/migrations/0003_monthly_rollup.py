@@ -0,0 +1,31 @@
+# Generated by Django 5.1.7 on 2026-10-17 03:03
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_ff', '0002_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyRollup',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('month', models.DateField()),
+                ('type', models.CharField(choices=[('income', 'Income'), ('expense', 'Expense')], max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('posted', 'Posted'), ('cleared', 'Cleared')], max_length=10)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app_ff.familymember')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app_ff.tag')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('month', 'member', 'tag', 'type', 'status'), name='monthly_rollup_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.7 on 2026-10-17 03:08
+
+import calendar
+
+from django.db import migrations, models
+
+
+def add_months(value, months):
+    # Cópia de app_ff.recurrence.add_months, congelada para que a migração não mude
+    # se o helper do app mudar
+    month_index = value.month - 1 + months
+    year = value.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(value.day, calendar.monthrange(year, month)[1])
+    return value.replace(year=year, month=month, day=day)
+
+
+def close_posted_recurrences(apps, schema_editor):
+    # Recorrências postadas antes desta migração já têm as 12 despesas gravadas:
+    # a regra passa a terminar na 12ª ocorrência, já materializada.
+    Transaction = apps.get_model('app_ff', 'Transaction')
+    transactions = Transaction.objects.filter(type='expense', recurrence='recurring', status='posted')
+    for transaction in transactions.iterator():
+        transaction.recurrence_end = transaction.materialized_until = add_months(transaction.due_date, 11)
+        transaction.save(update_fields=['recurrence_end', 'materialized_until'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_ff', '0004_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='frequency',
+            field=models.CharField(choices=[('weekly', 'Weekly'), ('monthly', 'Monthly'), ('yearly', 'Yearly')], default='monthly', max_length=7),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='materialized_until',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='recurrence_end',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.RunPython(close_posted_recurrences, migrations.RunPython.noop),
+    ]
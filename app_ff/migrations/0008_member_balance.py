@@ -0,0 +1,27 @@
+# Generated by Django 5.1.7 on 2026-10-17 03:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_ff', '0007_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberBalance',
+            fields=[
+                ('member', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='balance', serialize=False, to='app_ff.familymember')),
+                ('expense_pending', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('expense_posted', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('expense_cleared', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('income_pending', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('income_posted', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('income_cleared', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
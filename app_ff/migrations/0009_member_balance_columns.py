@@ -0,0 +1,47 @@
+# Generated by Django 5.1.7 on 2026-10-17 05:12
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def rebuild_balances(apps, schema_editor):
+    # As colunas "pending" passam a somar as transações ainda não postadas e as "posted"
+    # as despesas/receitas em aberto: os saldos gravados antes são recalculados.
+    # Cópia de MemberBalance.compute(), congelada para que a migração não mude com o modelo.
+    Transaction = apps.get_model('app_ff', 'Transaction')
+    MemberBalance = apps.get_model('app_ff', 'MemberBalance')
+    totals = {}
+
+    def add(member_id, field, amount):
+        member_totals = totals.setdefault(member_id, {})
+        member_totals[field] = member_totals.get(field, Decimal('0')) + amount
+
+    pending = Transaction.objects.filter(status='pending').values('type', 'member_id').annotate(total=models.Sum('total_amount')).order_by()
+    for row in pending:
+        add(row['member_id'], f"{row['type']}_pending", row['total'])
+    for transaction_type, model_name in [('expense', 'Expense'), ('income', 'Income')]:
+        rows = (
+            apps.get_model('app_ff', model_name).objects
+            .values('status', member_id=models.F('transaction__member'))
+            .annotate(total=models.Sum('amount')).order_by()
+        )
+        for row in rows:
+            add(row['member_id'], f"{transaction_type}_{'cleared' if row['status'] == 'cleared' else 'posted'}", row['total'])
+
+    MemberBalance.objects.all().delete()
+    MemberBalance.objects.bulk_create([
+        MemberBalance(member_id=member_id, **{field: total.quantize(Decimal('0.01')) for field, total in member_totals.items()})
+        for member_id, member_totals in totals.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_ff', '0008_member_balance'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_balances, migrations.RunPython.noop),
+    ]
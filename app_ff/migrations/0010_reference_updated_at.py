@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-17 04:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_ff', '0009_member_balance_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='familymember',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
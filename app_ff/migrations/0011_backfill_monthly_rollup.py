@@ -0,0 +1,34 @@
+# Generated by Django 5.1.7 on 2026-10-17 04:31
+
+from django.db import migrations, models
+from django.db.models.functions import TruncMonth
+
+
+def rebuild_rollups(apps, schema_editor):
+    # A tabela do resumo (0003) foi criada vazia: em bancos com despesas/receitas anteriores,
+    # o primeiro clear() de uma linha antiga criava uma linha com contagem e total negativos.
+    # Cópia de MonthlyRollup.rebuild(), congelada para que a migração não mude com o modelo.
+    MonthlyRollup = apps.get_model('app_ff', 'MonthlyRollup')
+    rollups = []
+    for transaction_type, model_name in [('expense', 'Expense'), ('income', 'Income')]:
+        rows = (
+            apps.get_model('app_ff', model_name).objects
+            .values('status', month=TruncMonth('date'), member_id=models.F('transaction__member'), tag_id=models.F('transaction__tag'))
+            .annotate(total=models.Sum('amount'), count=models.Count('id'))
+            .order_by()
+        )
+        rollups.extend(MonthlyRollup(type=transaction_type, **row) for row in rows)
+
+    MonthlyRollup.objects.all().delete()
+    MonthlyRollup.objects.bulk_create(rollups, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_ff', '0010_reference_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_rollups, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,19 @@
 import uuid
 from datetime import timedelta, date
-from django.db import models
+from decimal import Decimal
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction as db_transaction
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from . import cache, installments
+from .recurrence import FREQUENCY_CHOICES, add_months, occurrence_dates, window_end
+
+# Tamanho dos lotes usados nos INSERTs/UPDATEs em massa
+BULK_BATCH_SIZE = 500
+
+# Precisão dos valores monetários
+CENTS = Decimal('0.01')
 
 # Lista de opções para o campo "status" das transações, despesas e receitas
 STATUS_CHOICES = [
@@ -37,6 +50,7 @@ class FamilyMember(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=100)  # Nome do membro
     relationship = models.CharField(max_length=10, choices=RELATIONSHIP_CHOICES)  # Tipo de relação
+    updated_at = models.DateTimeField(auto_now=True)  # Versão do membro embutido nas transações (ETag)
 
     # Representação textual do objeto
     def __str__(self):
@@ -47,84 +61,318 @@ class Tag(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=100, default="Other")  # Nome da tag
     type = models.CharField(max_length=10, choices=TYPE_CHOICES)  # Tipo: receita ou despesa
+    updated_at = models.DateTimeField(auto_now=True)  # Versão da tag embutida nas transações (ETag)
 
     def __str__(self):
         return self.name
 
 # Função auxiliar para retornar a tag padrão (caso nenhuma seja fornecida)
 def get_default_tag():
-    # Busca ou cria a tag chamada "Other" do tipo "expense" e retorna seu ID
-    return Tag.objects.get_or_create(name="Other", type="expense")[0].id
+    # Busca ou cria a tag chamada "Other" do tipo "expense" e retorna seu ID (com cache)
+    tag_id = cache.get_cache().get(cache.DEFAULT_TAG_KEY)
+    if tag_id is None:
+        tag_id = Tag.objects.get_or_create(name="Other", type="expense")[0].id
+        cache.set_on_commit(cache.DEFAULT_TAG_KEY, tag_id)
+    return tag_id
+
+# QuerySet das transações: o bulk_create (importação, seed) também soma as transações
+# pendentes ao saldo dos membros (MemberBalance), como o save()
+class TransactionQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        with db_transaction.atomic(savepoint=False):
+            created = super().bulk_create(objs, *args, **kwargs)
+            MemberBalance.apply_deltas({}, MemberBalance.pending_totals(created))
+        return created
 
 # Modelo que representa uma transação financeira
 class Transaction(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)  # Data/hora de criação
+    updated_at = models.DateTimeField(auto_now=True)  # Data/hora da última alteração
     due_date = models.DateField()  # Data de vencimento
     description = models.TextField()  # Descrição da transação
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)  # Valor total
     type = models.CharField(max_length=10, choices=TYPE_CHOICES)  # Tipo: receita ou despesa
     recurrence = models.CharField(max_length=11, choices=RECURRENCE_CHOICES, default='one_time')  # Recorrência
+    frequency = models.CharField(max_length=7, choices=FREQUENCY_CHOICES, default='monthly')  # Frequência (se recorrente)
+    recurrence_end = models.DateField(null=True, blank=True)  # Última data da recorrência (vazio = sem fim)
+    materialized_until = models.DateField(null=True, blank=True, editable=False)  # Até quando as ocorrências já foram gravadas
     total_installments = models.IntegerField(null=True, blank=True)  # Total de parcelas (se houver)
     member = models.ForeignKey(FamilyMember, on_delete=models.CASCADE)  # Membro associado
     tag = models.ForeignKey(Tag, on_delete=models.CASCADE, default=get_default_tag)  # Categoria/tag da transação
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')  # Status da transação
 
+    objects = TransactionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Paginação/listagem por vencimento
+            models.Index(fields=['due_date', 'id'], name='transaction_due_date_id_idx'),
+            # Transações de um membro por vencimento
+            models.Index(fields=['member', 'due_date'], name='transaction_member_due_idx'),
+            # Filtros por status e por tipo ao longo do tempo
+            models.Index(fields=['status', 'due_date'], name='transaction_status_due_idx'),
+            models.Index(fields=['type', 'due_date'], name='transaction_type_due_idx'),
+            # Índice parcial só com as pendentes (ignorado em bancos sem suporte)
+            models.Index(fields=['due_date'], condition=models.Q(status='pending'), name='transaction_pending_due_idx'),
+            # Versão da tabela para os cabeçalhos ETag/Last-Modified
+            models.Index(fields=['updated_at'], name='transaction_updated_at_idx'),
+        ]
+
     def __str__(self):
         return f"{self.description} - {self.status}"
 
-    def post(self):
+    def save(self, *args, **kwargs):
         """
-        Método para "postar" a transação.
-        Dependendo do tipo e da recorrência, cria objetos de Expense ou Income.
+        Salva a transação mantendo o saldo dos membros: uma transação nova e pendente soma
+        o valor ao pendente do membro; numa edição, o valor anterior (com o membro e o tipo
+        anteriores) sai e o novo entra, e se o membro, a tag ou o tipo mudarem as
+        despesas/receitas já gravadas são movidas no resumo mensal e no saldo.
         """
+        with db_transaction.atomic(savepoint=False):
+            previous = None
+            if not self._state.adding:
+                # Bloqueia a linha para que duas edições concorrentes não descontem o mesmo valor
+                previous = Transaction.objects.select_for_update().filter(pk=self.pk).first()
+            super().save(*args, **kwargs)
 
-        # Verifica se a transação ainda está pendente
-        if self.status != 'pending':
-            raise ValueError("Only pending transactions can be posted.")
+            balances = MemberBalance.pending_totals([self])
+            deltas = {}
+            if previous is not None:
+                MemberBalance.pending_totals([previous], sign=-1, totals=balances)
+                if (previous.member_id, previous.tag_id, previous.type) != (self.member_id, self.tag_id, self.type):
+                    # Move as despesas/receitas já gravadas da chave anterior para a atual
+                    deltas = self.entry_deltas([(previous, -1), (self, 1)])
+            MonthlyRollup.apply_deltas(deltas, balances)
+
+    def entry_deltas(self, keys):
+        """
+        Deltas do resumo mensal das despesas/receitas já gravadas da transação, somadas
+        por mês e status. "keys" tem pares (transação, sinal): a transação informa a
+        chave (membro, tag e tipo) e o sinal diz se os totais entram (1) ou saem (-1).
+        """
+        deltas = {}
+        for model in [Expense, Income]:
+            rows = (
+                model.objects.filter(transaction=self)
+                .values('status', month=TruncMonth('date'))
+                .annotate(total=models.Sum('amount'), count=models.Count('id'))
+                .order_by()
+            )
+            for row in rows:
+                for transaction, sign in keys:
+                    key = (row['month'], transaction.member_id, transaction.tag_id, transaction.type, row['status'])
+                    MonthlyRollup.add_delta(deltas, key, sign * row['total'], sign * row['count'])
+        return deltas
+
+    def remove_totals(self, rollup=True):
+        """
+        Desconta do saldo do membro tudo o que a transação soma (o valor, se pendente, ou
+        as despesas/receitas já gravadas) e, com "rollup", também do resumo mensal.
+        Chamado antes de a transação ser removida (ver signals).
+        """
+        deltas = self.entry_deltas([(self, -1)]) if self.status != 'pending' else {}
+        balances = MemberBalance.pending_totals([self], sign=-1)
+        if rollup:
+            MonthlyRollup.apply_deltas(deltas, balances)
+        else:
+            MemberBalance.apply_deltas(deltas, balances)
+
+    def build_occurrences(self, until, after=None):
+        """
+        Monta em memória as despesas da recorrência com data no intervalo (after, until].
+        """
+        return [
+            Expense(
+                transaction=self,
+                amount=self.total_amount,
+                date=occurrence_date,
+                current_installment=None,
+                total_installments=None
+            )
+            for occurrence_date in occurrence_dates(self.due_date, self.frequency, until, after=after, end=self.recurrence_end)
+        ]
+
+    def build_entries(self, until=None, amounts=None):
+        """
+        Monta em memória (sem salvar) as despesas ou receitas geradas pela transação.
+        Recorrências só são geradas até o fim da janela (until); o restante fica para
+        o comando materialize_recurrences. Parcelas somam exatamente o total (o resto vai
+        na última); "amounts" recebe (parcela, última parcela) em centavos já calculados
+        em lote (ver installments.plan). Retorna uma tupla (despesas, receitas).
+        """
+        expenses = []
+        incomes = []
 
         # Se for uma despesa
         if self.type == 'expense':
             # Se for parcelada e tiver número de parcelas
             if self.recurrence == 'installment' and self.total_installments:
+                base, last = amounts or installments.split(installments.to_cents(self.total_amount), self.total_installments)
                 for i in range(self.total_installments):
                     # Define a data da parcela (incrementa o mês)
-                    installment_due_date = self.due_date.replace(month=self.due_date.month + i)
+                    installment_due_date = add_months(self.due_date, i)
                     # Cria uma despesa para cada parcela
-                    Expense.objects.create(
+                    expenses.append(Expense(
                         transaction=self,
-                        amount=self.total_amount / self.total_installments,
+                        amount=installments.from_cents(last if i == self.total_installments - 1 else base),
                         date=installment_due_date,
                         current_installment=i + 1,
                         total_installments=self.total_installments,
-                    )
+                    ))
             # Se for uma despesa recorrente (ex: mensal)
             elif self.recurrence == 'recurring':
-                for i in range(12):  # Cria para os próximos 12 meses
-                    recurring_due_date = self.due_date.replace(month=self.due_date.month + i) - timedelta(days=10)
-                    Expense.objects.create(
-                        transaction=self,
-                        amount=self.total_amount,
-                        date=recurring_due_date,
-                        current_installment=None,
-                        total_installments=None
-                    )
+                # Gera as ocorrências da janela (sempre ao menos a primeira)
+                until = max(until or window_end(), self.due_date)
+                expenses.extend(self.build_occurrences(until))
+                self.materialized_until = until
             # Se for uma despesa única
             else:
-                Expense.objects.create(
+                expenses.append(Expense(
                     transaction=self,
                     amount=self.total_amount,
                     date=self.due_date,
                     current_installment=1,
                     total_installments=1
-                )
+                ))
         else:
             # Se for receita, cria um único Income
-            Income.objects.create(transaction=self, amount=self.total_amount, date=self.due_date)
+            incomes.append(Income(transaction=self, amount=self.total_amount, date=self.due_date))
+
+        return expenses, incomes
+
+    def projected_entries(self, start=None, end=None):
+        """
+        Ocorrências ainda não gravadas no intervalo [start, end], montadas em memória.
+        Para recorrências postadas, são as datas além de materialized_until.
+        """
+        end = end or window_end()
+        if self.type == 'expense' and self.recurrence == 'recurring':
+            after = self.materialized_until if self.status != 'pending' else None
+            if start is not None:
+                day_before = start - timedelta(days=1)
+                after = max(after, day_before) if after else day_before
+            return self.build_occurrences(end, after=after)
+
+        if self.status != 'pending':
+            return []
+        expenses, incomes = self.build_entries()
+        return [entry for entry in expenses + incomes if (start is None or entry.date >= start) and entry.date <= end]
+
+    def post(self):
+        """
+        Método para "postar" a transação.
+        Dependendo do tipo e da recorrência, cria objetos de Expense ou Income.
+        Seguro contra chamadas concorrentes: só quem muda o status de "pending" para
+        "posted" no banco grava as despesas/receitas; as demais levantam ValueError.
+        """
+
+        # Verifica se a transação ainda está pendente
+        if self.status != 'pending':
+            raise ValueError("Only pending transactions can be posted.")
+
+        expenses, incomes = self.build_entries()
+
+        # Grava tudo em uma única transação de banco
+        with db_transaction.atomic():
+            # UPDATE condicional (WHERE status = 'pending'): a linha fica bloqueada até o
+            # commit e uma segunda postagem concorrente não encontra mais a linha pendente
+            updated_at = timezone.now()
+            claimed = Transaction.objects.filter(pk=self.pk, status='pending').update(
+                status='posted', materialized_until=self.materialized_until, updated_at=updated_at,
+            )
+            if not claimed:
+                self.status = Transaction.objects.filter(pk=self.pk).values_list('status', flat=True).first()
+                raise ValueError("Only pending transactions can be posted.")
+
+            Expense.objects.bulk_create(expenses, batch_size=BULK_BATCH_SIZE)
+            Income.objects.bulk_create(incomes, batch_size=BULK_BATCH_SIZE)
+            # O valor sai do pendente do membro e os lançamentos entram no resumo e no saldo
+            MonthlyRollup.add_entries(expenses + incomes, balances=MemberBalance.pending_totals([self], sign=-1))
+
+            self.status = 'posted'
+            self.updated_at = updated_at
+
+    @classmethod
+    def post_many(cls, queryset):
+        """
+        Posta em lote todas as transações pendentes do queryset.
+        As linhas são bloqueadas (select_for_update) e gravadas com um bulk_create por modelo
+        e UPDATEs em lotes, tudo dentro de uma transação.
+        Retorna a lista de transações postadas.
+        """
+        until = window_end()
+        with db_transaction.atomic():
+            transactions = list(queryset.select_for_update().filter(status='pending'))
+
+            # Valores de todas as parcelas do lote calculados de uma vez
+            split = [transaction for transaction in transactions
+                     if transaction.type == 'expense' and transaction.recurrence == 'installment' and transaction.total_installments]
+            bases, lasts = installments.plan(
+                [installments.to_cents(transaction.total_amount) for transaction in split],
+                [transaction.total_installments for transaction in split],
+            )
+            amounts = {transaction.pk: pair for transaction, pair in zip(split, zip(bases, lasts))}
+
+            expenses = []
+            incomes = []
+            for transaction in transactions:
+                transaction_expenses, transaction_incomes = transaction.build_entries(until, amounts.get(transaction.pk))
+                expenses.extend(transaction_expenses)
+                incomes.extend(transaction_incomes)
 
-        # Atualiza o status da transação para "posted"
-        self.status = 'posted'
-        self.save()
+            Expense.objects.bulk_create(expenses, batch_size=BULK_BATCH_SIZE)
+            Income.objects.bulk_create(incomes, batch_size=BULK_BATCH_SIZE)
+            MonthlyRollup.add_entries(expenses + incomes, balances=MemberBalance.pending_totals(transactions, sign=-1))
+
+            # Atualiza o status em lotes para não estourar o limite de parâmetros do banco
+            pks = [transaction.pk for transaction in transactions]
+            updated_at = timezone.now()
+            for start in range(0, len(pks), BULK_BATCH_SIZE):
+                cls.objects.filter(pk__in=pks[start:start + BULK_BATCH_SIZE]).update(status='posted', updated_at=updated_at)
+            # Cada recorrência grava o próprio fim da janela (build_entries usa o vencimento
+            # quando ele é posterior a "until")
+            recurring = [transaction for transaction in transactions if transaction.materialized_until]
+            cls.objects.bulk_update(recurring, ['materialized_until'], batch_size=BULK_BATCH_SIZE)
+
+            for transaction in transactions:
+                transaction.status = 'posted'
+                transaction.updated_at = updated_at
+
+        return transactions
+
+    @classmethod
+    def materialize_recurrences(cls, until=None):
+        """
+        Avança a janela das despesas recorrentes já postadas, gravando as ocorrências
+        que ainda faltam até "until" (por padrão, o fim da janela a partir de hoje).
+        Processa em lotes, cada um em sua própria transação. Retorna quantas despesas criou.
+        """
+        until = until or window_end()
+        queryset = cls.objects.filter(
+            type='expense', recurrence='recurring', status='posted', materialized_until__lt=until,
+        ).exclude(recurrence_end__lte=models.F('materialized_until'))
+
+        created = 0
+        while True:
+            with db_transaction.atomic():
+                transactions = list(queryset.select_for_update().order_by('pk')[:BULK_BATCH_SIZE])
+                if not transactions:
+                    break
+
+                expenses = []
+                updated_at = timezone.now()
+                for transaction in transactions:
+                    expenses.extend(transaction.build_occurrences(until, after=transaction.materialized_until))
+                    transaction.materialized_until = until
+                    transaction.updated_at = updated_at
+
+                Expense.objects.bulk_create(expenses, batch_size=BULK_BATCH_SIZE)
+                MonthlyRollup.add_entries(expenses)
+                cls.objects.bulk_update(transactions, ['materialized_until', 'updated_at'], batch_size=BULK_BATCH_SIZE)
+                created += len(expenses)
+
+        return created
 
 # Modelo que representa uma despesa (gerada a partir de uma transação de despesa)
 class Expense(models.Model):
@@ -135,16 +383,28 @@ class Expense(models.Model):
     current_installment = models.IntegerField(null=True, blank=True)  # Número da parcela (se aplicável)
     total_installments = models.IntegerField(null=True, blank=True)  # Total de parcelas (se aplicável)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')  # Status da despesa
+    updated_at = models.DateTimeField(auto_now=True)  # Data/hora da última alteração
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'id'], name='expense_date_id_idx'),
+            models.Index(fields=['status', 'date'], name='expense_status_date_idx'),
+            models.Index(fields=['date'], condition=models.Q(status='pending'), name='expense_pending_date_idx'),
+            # Versão da tabela para os cabeçalhos ETag/Last-Modified
+            models.Index(fields=['updated_at'], name='expense_updated_at_idx'),
+        ]
 
     def __str__(self):
         return f"Expense of $ {self.amount} - {self.status}"
 
     def clear(self):
         """
-        Marca a despesa como concluída.
+        Marca a despesa como concluída e move o valor no resumo mensal.
+        O status é lido e alterado no banco com a linha bloqueada (ver clear_entries), então
+        chamadas concorrentes ou com a instância desatualizada não movem o valor duas vezes.
         """
+        clear_entries(type(self).objects.filter(pk=self.pk))
         self.status = 'cleared'
-        self.save()
 
 # Modelo que representa uma receita (gerada a partir de uma transação de receita)
 class Income(models.Model):
@@ -153,13 +413,372 @@ class Income(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)  # Valor da receita
     date = models.DateField()  # Data da receita
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')  # Status da receita
+    updated_at = models.DateTimeField(auto_now=True)  # Data/hora da última alteração
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'id'], name='income_date_id_idx'),
+            models.Index(fields=['status', 'date'], name='income_status_date_idx'),
+            models.Index(fields=['date'], condition=models.Q(status='pending'), name='income_pending_date_idx'),
+            # Versão da tabela para os cabeçalhos ETag/Last-Modified
+            models.Index(fields=['updated_at'], name='income_updated_at_idx'),
+        ]
 
     def __str__(self):
         return f"Income of $ {self.amount} - {self.status}"
 
     def clear(self):
         """
-        Marca a receita como concluída.
+        Marca a receita como concluída e move o valor no resumo mensal.
+        O status é lido e alterado no banco com a linha bloqueada (ver clear_entries), então
+        chamadas concorrentes ou com a instância desatualizada não movem o valor duas vezes.
         """
+        clear_entries(type(self).objects.filter(pk=self.pk))
         self.status = 'cleared'
-        self.save()
+
+# Modelo com o resumo mensal pré-calculado (soma e contagem) de despesas e receitas,
+# mantido de forma incremental pelo post() e pelo clear()
+class MonthlyRollup(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    month = models.DateField()  # Primeiro dia do mês
+    member = models.ForeignKey(FamilyMember, on_delete=models.CASCADE)  # Membro da transação
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE)  # Tag da transação
+    type = models.CharField(max_length=10, choices=TYPE_CHOICES)  # Tipo: receita ou despesa
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)  # Status das linhas somadas
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)  # Soma dos valores
+    count = models.IntegerField(default=0)  # Quantidade de linhas
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['month', 'member', 'tag', 'type', 'status'], name='monthly_rollup_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.type} {self.status}: $ {self.total}"
+
+    @staticmethod
+    def entry_key(entry):
+        """
+        Chave do resumo para uma despesa ou receita.
+        """
+        transaction = entry.transaction
+        return (entry.date.replace(day=1), transaction.member_id, transaction.tag_id, transaction.type, entry.status)
+
+    @staticmethod
+    def add_delta(deltas, key, amount, count):
+        total, current = deltas.get(key, (0, 0))
+        deltas[key] = (total + amount, current + count)
+
+    @classmethod
+    def add_entries(cls, entries, sign=1, balances=None):
+        """
+        Soma (sign=1) ou subtrai (sign=-1) as despesas/receitas informadas do resumo.
+        """
+        deltas = {}
+        for entry in entries:
+            cls.add_delta(deltas, cls.entry_key(entry), sign * entry.amount, sign)
+        cls.apply_deltas(deltas, balances)
+
+    @classmethod
+    def apply_deltas(cls, deltas, balances=None):
+        """
+        Grava os deltas {chave: (valor, contagem)}: bloqueia as linhas existentes (um SELECT),
+        cria zeradas as que faltam e atualiza tudo com um bulk_update.
+        Os mesmos deltas são aplicados ao saldo dos membros (MemberBalance), na mesma transação,
+        junto com os totais "balances" {membro: {coluna: valor}} (ex: o pendente das transações postadas).
+        """
+        if not deltas:
+            MemberBalance.apply_deltas(deltas, balances)
+            return
+
+        with db_transaction.atomic(savepoint=False):
+            existing = cls.lock_rows(deltas)
+            missing = sorted(key for key in deltas if key not in existing)
+            if missing:
+                # Uma transação concorrente pode criar a mesma chave ao mesmo tempo: o INSERT
+                # espera o commit dela e é ignorado, e a linha é bloqueada em seguida
+                cls.objects.bulk_create([
+                    cls(month=month, member_id=member_id, tag_id=tag_id, type=transaction_type, status=status)
+                    for month, member_id, tag_id, transaction_type, status in missing
+                ], batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+                existing.update(cls.lock_rows(missing))
+
+            to_update = []
+            for key in sorted(deltas):
+                total, count = deltas[key]
+                rollup = existing[key]
+                rollup.total += total
+                rollup.count += count
+                to_update.append(rollup)
+
+            # Linhas que ficaram sem nenhum lançamento são removidas
+            empty = [rollup.pk for rollup in to_update if rollup.count == 0]
+            if empty:
+                cls.objects.filter(pk__in=empty).delete()
+            cls.objects.bulk_update([rollup for rollup in to_update if rollup.count], ['total', 'count'], batch_size=BULK_BATCH_SIZE)
+            MemberBalance.apply_deltas(deltas, balances)
+
+    @classmethod
+    def lock_rows(cls, keys):
+        """
+        Busca e bloqueia (select_for_update) as linhas das chaves informadas, sempre na
+        ordem da chave, para que dois lotes concorrentes não travem um ao outro.
+        O filtro pode trazer chaves a mais. Retorna {chave: linha}.
+        """
+        rows = cls.objects.select_for_update().filter(
+            month__in={key[0] for key in keys},
+            member_id__in={key[1] for key in keys},
+            tag_id__in={key[2] for key in keys},
+        ).order_by('month', 'member_id', 'tag_id', 'type', 'status')
+        return {(rollup.month, rollup.member_id, rollup.tag_id, rollup.type, rollup.status): rollup for rollup in rows}
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Recalcula todo o resumo a partir das despesas e receitas.
+        Retorna a quantidade de linhas criadas.
+        """
+        rollups = []
+        for transaction_type, model in [('expense', Expense), ('income', Income)]:
+            rows = (
+                model.objects
+                .values('status', month=TruncMonth('date'), member_id=models.F('transaction__member'), tag_id=models.F('transaction__tag'))
+                .annotate(total=models.Sum('amount'), count=models.Count('id'))
+                .order_by()
+            )
+            rollups.extend(cls(type=transaction_type, **row) for row in rows)
+
+        with db_transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(rollups, batch_size=BULK_BATCH_SIZE)
+        return len(rollups)
+
+
+# Modelo com o saldo consolidado de cada membro da família: por tipo, o valor das transações
+# pendentes e o das despesas/receitas em aberto e concluídas, mantidos pelo save() e pelo
+# bulk_create das transações, junto com o resumo mensal (ver MonthlyRollup.apply_deltas) e
+# pelos receivers de remoção (ver signals).
+# O painel de um membro é uma única leitura pela chave primária.
+class MemberBalance(models.Model):
+    member = models.OneToOneField(FamilyMember, on_delete=models.CASCADE, primary_key=True, related_name='balance')
+    expense_pending = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    expense_posted = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    expense_cleared = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    income_pending = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    income_posted = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    income_cleared = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Colunas de totais, na forma "<tipo>_<status>": "pending" soma o valor das transações
+    # ainda não postadas, "posted" o das despesas/receitas em aberto e "cleared" o das concluídas
+    TOTAL_FIELDS = [f'{transaction_type}_{status}' for transaction_type, _ in TYPE_CHOICES for status, _ in STATUS_CHOICES]
+
+    def __str__(self):
+        return f"Balance of {self.member_id}"
+
+    @staticmethod
+    def add_total(totals, member_id, field, amount):
+        if amount:
+            member_totals = totals.setdefault(member_id, {})
+            member_totals[field] = member_totals.get(field, 0) + amount
+
+    @staticmethod
+    def entry_field(transaction_type, status):
+        """
+        Coluna de uma despesa/receita: "cleared" se concluída, "posted" enquanto em aberto.
+        """
+        return f"{transaction_type}_{'cleared' if status == 'cleared' else 'posted'}"
+
+    @classmethod
+    def pending_totals(cls, transactions, sign=1, totals=None):
+        """
+        Valor das transações pendentes informadas, somado (sign=1) ou subtraído (sign=-1)
+        do pendente de cada membro: {membro: {coluna: valor}}, acumulado em "totals" se informado.
+        """
+        totals = {} if totals is None else totals
+        # O valor pode não ser Decimal antes de a instância ser recarregada (ex: create(total_amount='10.00'))
+        to_decimal = Transaction._meta.get_field('total_amount').to_python
+        for transaction in transactions:
+            if transaction.status == 'pending':
+                cls.add_total(totals, transaction.member_id, f'{transaction.type}_pending', sign * to_decimal(transaction.total_amount))
+        return totals
+
+    @classmethod
+    def apply_deltas(cls, deltas, balances=None):
+        """
+        Soma ao saldo dos membros os deltas do resumo mensal
+        {(mês, membro, tag, tipo, status): (valor, contagem)} e os totais "balances"
+        {membro: {coluna: valor}}, criando as linhas que faltam.
+        """
+        totals = {}
+        for member_id, member_totals in (balances or {}).items():
+            for field, total in member_totals.items():
+                cls.add_total(totals, member_id, field, total)
+        for (month, member_id, tag_id, transaction_type, status), (total, count) in deltas.items():
+            cls.add_total(totals, member_id, cls.entry_field(transaction_type, status), total)
+        if not totals:
+            return
+
+        with db_transaction.atomic(savepoint=False):
+            # Como no resumo mensal: bloqueia as linhas existentes na ordem do membro, cria
+            # zeradas as que faltam (o INSERT de uma chave criada ao mesmo tempo por outra
+            # transação espera o commit dela e é ignorado) e grava tudo com um bulk_update
+            existing = cls.lock_rows(totals)
+            missing = sorted((member_id for member_id in totals if member_id not in existing), key=str)
+            if missing:
+                cls.objects.bulk_create([cls(member_id=member_id) for member_id in missing],
+                                        batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+                existing.update(cls.lock_rows(missing))
+
+            updated_at = timezone.now()
+            to_update = []
+            fields = set()
+            for member_id in sorted(totals, key=str):
+                balance = existing[member_id]
+                for field, total in totals[member_id].items():
+                    setattr(balance, field, getattr(balance, field) + total)
+                    fields.add(field)
+                balance.updated_at = updated_at
+                to_update.append(balance)
+            cls.objects.bulk_update(to_update, sorted(fields) + ['updated_at'], batch_size=BULK_BATCH_SIZE)
+
+    @classmethod
+    def lock_rows(cls, member_ids):
+        """
+        Busca e bloqueia (select_for_update) os saldos dos membros informados, na ordem do
+        membro, para que dois lotes concorrentes não travem um ao outro. Retorna {membro: saldo}.
+        """
+        rows = cls.objects.select_for_update().filter(pk__in=list(member_ids)).order_by('pk')
+        return {balance.pk: balance for balance in rows}
+
+    @classmethod
+    def compute(cls):
+        """
+        Recalcula os totais a partir das transações pendentes e das despesas e receitas:
+        {membro: {coluna: total}}.
+        """
+        totals = {}
+        pending = Transaction.objects.filter(status='pending').values('type', 'member_id').annotate(total=models.Sum('total_amount')).order_by()
+        for row in pending:
+            cls.add_total(totals, row['member_id'], f"{row['type']}_pending", row['total'])
+        for transaction_type, model in [('expense', Expense), ('income', Income)]:
+            rows = (
+                model.objects.values('status', member_id=models.F('transaction__member'))
+                .annotate(total=models.Sum('amount')).order_by()
+            )
+            for row in rows:
+                cls.add_total(totals, row['member_id'], cls.entry_field(transaction_type, row['status']), row['total'])
+        return {
+            member_id: {field: total.quantize(CENTS) for field, total in member_totals.items()}
+            for member_id, member_totals in totals.items()
+        }
+
+    @classmethod
+    def drift(cls):
+        """
+        Compara os saldos gravados com os recalculados e retorna as diferenças
+        [(membro, coluna, gravado, recalculado)].
+        """
+        expected = cls.compute()
+        stored = {balance.pk: balance for balance in cls.objects.all()}
+        differences = []
+        for member_id in sorted(set(expected) | set(stored), key=str):
+            balance = stored.get(member_id)
+            for field in cls.TOTAL_FIELDS:
+                current = getattr(balance, field) if balance else Decimal('0')
+                correct = expected.get(member_id, {}).get(field, Decimal('0'))
+                if current != correct:
+                    differences.append((member_id, field, current, correct))
+        return differences
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Regrava todos os saldos a partir das despesas e receitas. Retorna quantas linhas criou.
+        """
+        balances = [cls(member_id=member_id, **totals) for member_id, totals in cls.compute().items()]
+        with db_transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(balances, batch_size=BULK_BATCH_SIZE)
+        return len(balances)
+
+
+def clear_entries(queryset):
+    """
+    Marca como concluídas todas as despesas ou receitas do queryset que ainda não estão.
+    As linhas são bloqueadas e lidas uma única vez (só as colunas do resumo mensal) e o
+    status é gravado com um UPDATE a cada BULK_BATCH_SIZE linhas, sem carregar instâncias.
+    Retorna a quantidade de linhas alteradas.
+    """
+    with db_transaction.atomic():
+        rows = list(
+            queryset.exclude(status='cleared')
+            .select_for_update(of=('self',))
+            .values_list('pk', 'date', 'amount', 'status', 'transaction__member', 'transaction__tag', 'transaction__type')
+        )
+
+        deltas = {}
+        for pk, entry_date, amount, status, member_id, tag_id, transaction_type in rows:
+            key = (entry_date.replace(day=1), member_id, tag_id, transaction_type)
+            MonthlyRollup.add_delta(deltas, key + (status,), -amount, -1)
+            MonthlyRollup.add_delta(deltas, key + ('cleared',), amount, 1)
+        MonthlyRollup.apply_deltas(deltas)
+
+        pks = [row[0] for row in rows]
+        updated_at = timezone.now()
+        for start in range(0, len(pks), BULK_BATCH_SIZE):
+            queryset.model.objects.filter(pk__in=pks[start:start + BULK_BATCH_SIZE]).update(status='cleared', updated_at=updated_at)
+
+    return len(pks)
+
+
+# Modelo de uma tarefa da fila em segundo plano (ver app_ff/jobs.py), processada
+# pelo comando run_workers sem depender de um broker externo
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),         # Na fila (ou aguardando nova tentativa)
+        ('running', 'Running'),       # Em execução por um worker
+        ('succeeded', 'Succeeded'),   # Concluída
+        ('failed', 'Failed')          # Falhou em todas as tentativas
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=50)  # Tipo da tarefa (nome do handler)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)  # Parâmetros da tarefa
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    idempotency_key = models.CharField(max_length=255, unique=True, null=True, blank=True)  # Header Idempotency-Key
+    attempts = models.IntegerField(default=0)  # Tentativas já iniciadas
+    max_attempts = models.IntegerField(default=3)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)  # Retorno do handler
+    error = models.TextField(blank=True)  # Erro da última tentativa
+    worker = models.CharField(max_length=100, blank=True)  # Worker que pegou a tarefa
+    run_after = models.DateTimeField(default=timezone.now)  # Não executa antes deste horário
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Próximas tarefas da fila
+            models.Index(fields=['run_after'], condition=models.Q(status='queued'), name='job_queued_run_after_idx'),
+            models.Index(fields=['status', 'started_at'], name='job_status_started_idx'),
+            models.Index(fields=['created_at', 'id'], name='job_created_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} ({self.status})"
+
+
+# Modelo com a resposta já enviada para cada Idempotency-Key das ações síncronas
+# (ver app_ff/idempotency.py): a repetição de uma requisição devolve a mesma resposta
+class IdempotencyKey(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    key = models.CharField(max_length=255, unique=True)  # Valor do header Idempotency-Key
+    fingerprint = models.CharField(max_length=64)  # Hash do método, caminho e corpo da requisição
+    status_code = models.IntegerField()
+    response = models.JSONField(null=True, encoder=DjangoJSONEncoder)  # Corpo da resposta
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.key
@@ -0,0 +1,63 @@
+import calendar
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+# Frequências aceitas para transações recorrentes
+FREQUENCY_CHOICES = [
+    ('weekly', 'Weekly'),     # Semanal
+    ('monthly', 'Monthly'),   # Mensal
+    ('yearly', 'Yearly')      # Anual
+]
+
+# Quantos meses à frente as ocorrências recorrentes ficam gravadas como despesas.
+# Pode ser sobrescrito com APP_FF_RECURRENCE_WINDOW_MONTHS no settings.
+DEFAULT_WINDOW_MONTHS = 3
+
+
+def add_months(value, months):
+    """
+    Soma meses a uma data, ajustando o dia ao último dia do mês quando necessário
+    (ex: 31/01 + 1 mês = 28/02). Funciona também na virada do ano.
+    """
+    month_index = value.month - 1 + months
+    year = value.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(value.day, calendar.monthrange(year, month)[1])
+    return value.replace(year=year, month=month, day=day)
+
+
+def nth_occurrence(start, frequency, n):
+    """
+    Data da n-ésima ocorrência (a primeira é n=0), sempre calculada a partir do início
+    para que o dia original seja mantido (31/01, 28/02, 31/03, ...).
+    """
+    if frequency == 'weekly':
+        return start + timedelta(weeks=n)
+    if frequency == 'yearly':
+        return add_months(start, 12 * n)
+    return add_months(start, n)
+
+
+def occurrence_dates(start, frequency, until, after=None, end=None):
+    """
+    Gera as datas das ocorrências no intervalo (after, until], respeitando a data
+    final da recorrência (end), se houver.
+    """
+    n = 0
+    while True:
+        current = nth_occurrence(start, frequency, n)
+        if current > until or (end is not None and current > end):
+            return
+        if after is None or current > after:
+            yield current
+        n += 1
+
+
+def window_end(today=None):
+    """
+    Último dia da janela de ocorrências materializadas, contada a partir de hoje.
+    """
+    months = getattr(settings, 'APP_FF_RECURRENCE_WINDOW_MONTHS', DEFAULT_WINDOW_MONTHS)
+    return add_months(today or timezone.localdate(), months)
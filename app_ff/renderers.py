@@ -0,0 +1,50 @@
+# Renderer e parser JSON rápidos, baseados no orjson, que geram o mesmo JSON do
+# JSONRenderer do DRF (compacto, UTF-8, datas ISO com "Z" para UTC, UUIDs como texto).
+# Sem o orjson instalado, os dois usam a implementação padrão do DRF (json da stdlib).
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+# Tipos que o orjson não conhece (Decimal, textos traduzíveis, querysets, ...) são
+# convertidos pelo mesmo encoder usado pelo DRF
+encode_default = JSONEncoder().default
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Saída indentada (API navegável, "; indent=4") ou configurações fora do padrão
+        # (UNICODE_JSON/COMPACT_JSON desligados) ficam com o JSONRenderer
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if orjson is None or data is None or indent is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            content = orjson.dumps(data, default=encode_default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # Ex: inteiros acima de 64 bits; o JSONRenderer gera o resultado (ou o mesmo erro)
+            return super().render(data, accepted_media_type, renderer_context)
+        # Como o DRF, escapa \u2028 e \u2029 para que o JSON seja JavaScript válido
+        if b'\xe2\x80\xa8' in content or b'\xe2\x80\xa9' in content:
+            content = content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return content
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
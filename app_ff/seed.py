@@ -0,0 +1,57 @@
+# Gerador de dados sintéticos (membros, tags e transações de todos os tipos de
+# recorrência), usado pelo comando seed_data e pela suíte de benchmarks.
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from .models import BULK_BATCH_SIZE, FamilyMember, Tag, Transaction
+
+RELATIONSHIPS = ['father', 'mother', 'son', 'daughter', 'other']
+RECURRENCES = ['one_time', 'recurring', 'installment']
+
+
+def build_transactions(count, members, tags, rng, recurrence=None):
+    """
+    Monta (sem gravar) transações pendentes com datas até 6 meses antes ou depois de
+    hoje, para que a janela de recorrência gere sempre a mesma quantidade de despesas.
+    Sem "recurrence", alterna entre os três tipos; uma em cada quatro é receita.
+    """
+    today = timezone.localdate()
+    transactions = []
+    for i in range(count):
+        transaction_type = 'income' if recurrence is None and i % 4 == 0 else 'expense'
+        kind = recurrence or (RECURRENCES[i % len(RECURRENCES)] if transaction_type == 'expense' else 'one_time')
+        transactions.append(Transaction(
+            due_date=today + timedelta(days=rng.randint(-180, 180)),
+            description=f"Transaction {i}",
+            total_amount=Decimal(rng.randint(100, 500000)) / 100,
+            type=transaction_type,
+            recurrence=kind,
+            total_installments=rng.randint(2, 12) if kind == 'installment' else None,
+            member=rng.choice(members),
+            tag=rng.choice([tag for tag in tags if tag.type == transaction_type] or tags),
+        ))
+    return transactions
+
+
+def generate(members=5, tags=10, transactions=1000, seed=0, post=True):
+    """
+    Grava os membros, as tags e as transações (e posta todas, se "post"). O mesmo
+    seed gera sempre os mesmos dados. Retorna as transações criadas.
+    """
+    rng = random.Random(seed)
+    family = FamilyMember.objects.bulk_create([
+        FamilyMember(name=f"Member {i}", relationship=rng.choice(RELATIONSHIPS)) for i in range(members)
+    ])
+    categories = Tag.objects.bulk_create([
+        Tag(name=f"Tag {i}", type='income' if i % 3 == 0 else 'expense') for i in range(tags)
+    ])
+
+    created = Transaction.objects.bulk_create(
+        build_transactions(transactions, family, categories, rng), batch_size=BULK_BATCH_SIZE
+    )
+    if post:
+        Transaction.post_many(Transaction.objects.filter(pk__in=[transaction.pk for transaction in created]))
+    return created
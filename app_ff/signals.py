@@ -0,0 +1,44 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import cache
+from .models import Expense, FamilyMember, Income, MonthlyRollup, Tag, Transaction
+
+
+# Invalida o cache de referência sempre que uma tag muda ou é removida.
+# A tag padrão também é descartada, pois pode ser justamente a tag alterada.
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag(sender, instance, **kwargs):
+    cache.invalidate(cache.instance_key(Tag, instance.pk))
+    cache.invalidate(cache.DEFAULT_TAG_KEY)
+
+
+# Invalida o cache de referência sempre que um membro da família muda ou é removido
+@receiver(post_save, sender=FamilyMember)
+@receiver(post_delete, sender=FamilyMember)
+def invalidate_member(sender, instance, **kwargs):
+    cache.invalidate(cache.instance_key(FamilyMember, instance.pk))
+
+
+def origin_model(origin):
+    return origin.model if isinstance(origin, QuerySet) else type(origin)
+
+
+# Desconta do saldo dos membros e do resumo mensal as transações removidas, inclusive em
+# cascata (ex: ao remover uma tag ou um membro). Os pre_delete rodam antes de qualquer
+# DELETE, então as despesas/receitas da transação ainda podem ser somadas. Em cascata, as
+# linhas do resumo da tag/membro removido também são removidas: só o saldo é ajustado.
+@receiver(pre_delete, sender=Transaction)
+def remove_transaction_totals(sender, instance, origin=None, **kwargs):
+    instance.remove_totals(rollup=origin_model(origin) is sender)
+
+
+# Desconta do resumo mensal (e do saldo) as despesas/receitas removidas diretamente; as
+# removidas junto com a transação já foram descontadas por remove_transaction_totals
+@receiver(pre_delete, sender=Expense)
+@receiver(pre_delete, sender=Income)
+def remove_entry_totals(sender, instance, origin=None, **kwargs):
+    if origin_model(origin) is sender:
+        MonthlyRollup.add_entries([instance], sign=-1)
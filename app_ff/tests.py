@@ -1,3 +1,1280 @@
-from django.test import TestCase
+import io
+import json
+import random
+import threading
+import uuid
+import zoneinfo
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from importlib import import_module
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection
+from django.db.models import Sum
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from . import cache, forecast, installments, jobs
+from .benchmarks import BENCHMARKS
+from .models import FamilyMember, Tag, Transaction, Expense, Income, IdempotencyKey, Job, MemberBalance, MonthlyRollup, get_default_tag, clear_entries
+from .recurrence import add_months, occurrence_dates, window_end
+from .renderers import FastJSONParser, FastJSONRenderer
+from .seed import generate
+from .views import ExpenseViewSet, IncomeViewSet, MonthlyRollupViewSet, TransactionSerializer, TransactionViewSet, values_reader
+
+
+class FamilyFixtures:
+    """
+    Membro e etiqueta usados pela maioria dos testes, e uma fábrica de transações com
+    valores padrão que cada teste sobrescreve por keyword. Serve a TestCase e TransactionTestCase.
+    """
+    def setUp(self):
+        super().setUp()
+        self.member = FamilyMember.objects.create(name="Ana", relationship="mother")
+        self.tag = Tag.objects.create(name="Casa", type="expense")
+
+    def make_transaction(self, **kwargs):
+        data = {
+            'due_date': date(2025, 1, 15),
+            'description': 'Teste',
+            'total_amount': Decimal('100.00'),
+            'type': 'expense',
+            'member': self.member,
+            'tag': self.tag,
+        }
+        data.update(kwargs)
+        return Transaction.objects.create(**data)
+
+
+class TransactionPostTests(FamilyFixtures, TestCase):
+    def test_post_installment_creates_expenses_in_one_insert(self):
+        transaction = self.make_transaction(recurrence='installment', total_installments=3)
+        # SAVEPOINT/RELEASE + 1 UPDATE de status + 1 INSERT em massa + resumo mensal (SELECT, INSERT
+        # das chaves novas, SELECT delas e UPDATE) + saldo do membro, criado junto com a
+        # transação pendente (SELECT e UPDATE)
+        with self.assertNumQueries(10):
+            transaction.post()
+
+        self.assertEqual(transaction.expenses.count(), 3)
+        transaction.refresh_from_db()
+        self.assertEqual(transaction.status, 'posted')
+
+    def test_post_rejects_non_pending(self):
+        transaction = self.make_transaction(status='posted')
+        with self.assertRaises(ValueError):
+            transaction.post()
+
+    def test_post_many_posts_only_pending(self):
+        self.make_transaction()
+        self.make_transaction(recurrence='recurring', recurrence_end=date(2025, 12, 15))
+        self.make_transaction(type='income')
+        already_posted = self.make_transaction(status='posted')
+
+        posted = Transaction.post_many(Transaction.objects.all())
+
+        self.assertEqual(len(posted), 3)
+        self.assertEqual(Expense.objects.count(), 13)
+        self.assertEqual(Income.objects.count(), 1)
+        self.assertFalse(Transaction.objects.filter(status='pending').exists())
+        self.assertFalse(already_posted.expenses.exists())
+
+
+class TransactionPostBatchTests(FamilyFixtures, TestCase):
+    def test_post_batch_by_ids_reports_each_id(self):
+        pending = self.make_transaction()
+        posted = self.make_transaction(status='posted')
+        missing = uuid.uuid4()
+
+        response = self.client.post(
+            '/api/transactions/post_batch/',
+            {'ids': [str(pending.pk), str(posted.pk), str(missing)]},
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['posted'], 1)
+        results = {item['id']: item['result'] for item in response.json()['results']}
+        self.assertEqual(results, {
+            str(pending.pk): 'posted',
+            str(posted.pk): 'not_pending',
+            str(missing): 'not_found',
+        })
+
+    def test_post_batch_reports_ids_outside_filters_as_skipped(self):
+        january = self.make_transaction(due_date=date(2025, 1, 10))
+        february = self.make_transaction(due_date=date(2025, 2, 10))
+        posted = self.make_transaction(due_date=date(2025, 1, 10), status='posted')
+
+        response = self.client.post(
+            '/api/transactions/post_batch/',
+            {'ids': [str(january.pk), str(february.pk), str(posted.pk)], 'due_date_before': '2025-01-31'},
+            content_type='application/json',
+        )
+
+        results = {item['id']: item['result'] for item in response.json()['results']}
+        self.assertEqual(results, {
+            str(january.pk): 'posted',
+            str(february.pk): 'skipped',
+            str(posted.pk): 'not_pending',
+        })
+
+    def test_post_batch_by_filter(self):
+        self.make_transaction(due_date=date(2025, 1, 10))
+        self.make_transaction(due_date=date(2025, 1, 20))
+        late = self.make_transaction(due_date=date(2025, 2, 10))
+
+        response = self.client.post(
+            '/api/transactions/post_batch/',
+            {'due_date_before': '2025-01-31'},
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.json()['posted'], 2)
+        late.refresh_from_db()
+        self.assertEqual(late.status, 'pending')
+
+    def test_post_batch_requires_ids_or_filter(self):
+        response = self.client.post('/api/transactions/post_batch/', {}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class ListQueryCountTests(TestCase):
+    def setUp(self):
+        self.member = FamilyMember.objects.create(name="Ana", relationship="mother")
+
+    def add_transactions(self, count):
+        for _ in range(count):
+            tag = Tag.objects.create(name="Casa", type="expense")
+            Transaction.objects.create(
+                due_date=date(2025, 1, 15),
+                description='Teste',
+                total_amount=Decimal('10.00'),
+                type='expense',
+                member=self.member,
+                tag=tag,
+            ).post()
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_list_query_count_does_not_grow_with_rows(self):
+        for url in ['/api/transactions/', '/api/expenses/', '/api/incomes/']:
+            with self.subTest(url=url):
+                self.add_transactions(2)
+                small = self.count_queries(url)
+                self.add_transactions(20)
+                large = self.count_queries(url)
+                self.assertEqual(small, large)
+
+
+class ValuesReaderTests(TestCase):
+    def test_list_matches_model_serializers(self):
+        generate(members=2, tags=3, transactions=12, seed=3)
+        endpoints = [
+            ('/api/transactions/', TransactionViewSet),
+            ('/api/expenses/', ExpenseViewSet),
+            ('/api/incomes/', IncomeViewSet),
+            ('/api/rollups/', MonthlyRollupViewSet),
+        ]
+        for url, viewset in endpoints:
+            with self.subTest(url=url):
+                queryset = viewset.queryset.order_by(*viewset.ordering)
+                expected = JSONRenderer().render(viewset.serializer_class(queryset, many=True).data)
+                response = self.client.get(url, {'page_size': 1000})
+                self.assertEqual(json.dumps(response.json()['results']), json.dumps(json.loads(expected)))
+
+    def test_datetimes_follow_current_timezone(self):
+        generate(members=1, tags=2, transactions=3, seed=3)
+        with timezone.override(zoneinfo.ZoneInfo('America/Sao_Paulo')):
+            expected = TransactionSerializer(TransactionViewSet.queryset.order_by('due_date', 'id'), many=True).data
+            reader = values_reader(TransactionSerializer)
+            data = reader.represent(reader.queryset(TransactionViewSet.queryset.order_by('due_date', 'id')))
+        self.assertEqual(data[0]['created_at'], expected[0]['created_at'])
+        self.assertTrue(data[0]['created_at'].endswith('-03:00'))
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        member = FamilyMember.objects.create(name="Ana", relationship="mother")
+        tag = Tag.objects.create(name="Salário", type="income")
+        for day in [5, 1, 5, 3, 5, 2, 4]:
+            Transaction.objects.create(
+                due_date=date(2025, 1, day),
+                description='Teste',
+                total_amount=Decimal('10.00'),
+                type='income',
+                member=member,
+                tag=tag,
+            ).post()
+        self.expected = list(Income.objects.order_by('date', 'id').values_list('id', flat=True))
+
+    def test_next_links_walk_every_row_once_in_order(self):
+        ids = []
+        url = '/api/incomes/?page_size=3'
+        while url:
+            body = self.client.get(url).json()
+            ids.extend(item['id'] for item in body['results'])
+            url = body['next']
+        self.assertEqual(ids, [str(pk) for pk in self.expected])
+
+    def test_previous_link_returns_previous_page(self):
+        first = self.client.get('/api/incomes/?page_size=3').json()
+        second = self.client.get(first['next']).json()
+        self.assertIsNone(first['previous'])
+        back = self.client.get(second['previous']).json()
+        self.assertEqual(back['results'], first['results'])
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get('/api/incomes/?cursor=bogus')
+        self.assertEqual(response.status_code, 404)
+
+
+class SummaryTests(FamilyFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        for due_date, amount in [(date(2025, 1, 10), '10.00'), (date(2025, 1, 20), '5.50'), (date(2025, 2, 5), '7.00')]:
+            self.make_transaction(due_date=due_date, total_amount=Decimal(amount)).post()
+
+    def test_summary_groups_by_each_dimension(self):
+        with self.assertNumQueries(8):
+            body = self.client.get('/api/summary/').json()
+
+        expense = body['expense']
+        self.assertEqual(
+            [(row['month'], row['total'], row['count']) for row in expense['by_month']],
+            [('2025-01-01', '15.50', 2), ('2025-02-01', '7.00', 1)],
+        )
+        self.assertEqual(expense['by_tag'][0]['tag_name'], 'Casa')
+        self.assertEqual(expense['by_member'][0]['member'], str(self.member.pk))
+        self.assertEqual(expense['by_status'], [{'status': 'pending', 'total': '22.50', 'count': 3}])
+        self.assertEqual(body['income']['by_month'], [])
+
+    def test_summary_date_range(self):
+        body = self.client.get('/api/summary/?date_after=2025-02-01').json()
+        self.assertEqual(len(body['expense']['by_month']), 1)
+        self.assertEqual(body['expense']['by_month'][0]['count'], 1)
+
+
+class MonthlyRollupTests(FamilyFixtures, TestCase):
+    def snapshot(self):
+        return sorted(MonthlyRollup.objects.values_list('month', 'member', 'tag', 'type', 'status', 'total', 'count'))
+
+    def test_incremental_rollup_matches_rebuild(self):
+        self.make_transaction(recurrence='installment', total_installments=3).post()
+        self.make_transaction(type='income').post()
+        self.make_transaction(due_date=date(2025, 2, 1))
+        self.make_transaction(due_date=date(2025, 2, 2), total_amount=Decimal('0.10'))
+        Transaction.post_many(Transaction.objects.all())
+        Expense.objects.order_by('date').first().clear()
+        Income.objects.get().clear()
+
+        incremental = self.snapshot()
+        MonthlyRollup.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_clear_moves_amount_between_statuses(self):
+        self.make_transaction().post()
+        expense = Expense.objects.get()
+        expense.clear()
+        expense.clear()
+
+        totals = dict(MonthlyRollup.objects.values_list('status', 'total'))
+        self.assertEqual(totals, {'cleared': Decimal('100.00')})
+
+    def test_stale_instances_clear_once(self):
+        self.make_transaction(type='income').post()
+        self.make_transaction().post()
+        for model in (Expense, Income):
+            first, stale = model.objects.get(), model.objects.get()
+            first.clear()
+            stale.clear()
+
+        self.assertEqual(self.snapshot(), [
+            (date(2025, 1, 1), self.member.pk, self.tag.pk, transaction_type, 'cleared', Decimal('100.00'), 1)
+            for transaction_type in ('expense', 'income')
+        ])
+        self.assertEqual(MemberBalance.drift(), [])
+
+    def test_deleted_entries_and_transactions_leave_rollup(self):
+        first = self.make_transaction(recurrence='installment', total_installments=3)
+        first.post()
+        second = self.make_transaction(type='income')
+        second.post()
+        self.make_transaction(due_date=date(2025, 3, 1)).post()
+
+        first.expenses.order_by('date').first().delete()
+        Income.objects.filter(transaction=second).delete()
+        Transaction.objects.filter(due_date=date(2025, 3, 1)).delete()
+        snapshot = self.snapshot()
+        self.assertEqual(snapshot, [
+            (date(2025, 2, 1), self.member.pk, self.tag.pk, 'expense', 'pending', Decimal('33.33'), 1),
+            (date(2025, 3, 1), self.member.pk, self.tag.pk, 'expense', 'pending', Decimal('33.34'), 1),
+        ])
+        MonthlyRollup.rebuild()
+        self.assertEqual(self.snapshot(), snapshot)
+        self.assertEqual(MemberBalance.drift(), [])
+
+    def test_backfill_migration_fills_rollup(self):
+        self.make_transaction(recurrence='installment', total_installments=3).post()
+        self.make_transaction(type='income').post()
+        expected = self.snapshot()
+
+        # Banco anterior ao resumo: lançamentos sem nenhuma linha no resumo
+        MonthlyRollup.objects.all().delete()
+        import_module('app_ff.migrations.0011_backfill_monthly_rollup').rebuild_rollups(apps, None)
+        self.assertEqual(self.snapshot(), expected)
+
+    def test_key_created_concurrently_is_incremented(self):
+        key = (date(2025, 1, 1), self.member.pk, self.tag.pk, 'expense', 'pending')
+        MonthlyRollup.objects.create(month=key[0], member=self.member, tag=self.tag, type='expense', status='pending',
+                                     total=Decimal('5.00'), count=1)
+
+        # Simula outra transação que gravou a chave depois do primeiro SELECT
+        lock_rows = MonthlyRollup.lock_rows
+        with mock.patch.object(MonthlyRollup, 'lock_rows', side_effect=[{}, lock_rows([key])]):
+            MonthlyRollup.apply_deltas({key: (Decimal('10.00'), 2)})
+
+        self.assertEqual(self.snapshot(), [key + (Decimal('15.00'), 3)])
+
+
+class ReferenceCacheTests(TestCase):
+    def setUp(self):
+        self.member = FamilyMember.objects.create(name="Ana", relationship="mother")
+        self.addCleanup(cache.clear)
+
+    def test_default_tag_is_cached_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            tag_id = get_default_tag()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_default_tag(), tag_id)
+
+    def test_create_transaction_skips_reference_queries_when_warm(self):
+        payload = {
+            'due_date': '2025-01-15',
+            'description': 'Teste',
+            'total_amount': '10.00',
+            'type': 'expense',
+            'member': str(self.member.pk),
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/transactions/', payload, content_type='application/json')
+
+        # Apenas o INSERT da transação e o saldo do membro (SELECT e UPDATE)
+        with self.assertNumQueries(3):
+            response = self.client.post('/api/transactions/', payload, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['member_detail']['name'], 'Ana')
+
+    def test_save_invalidates_cached_member(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            cache.get_instance(FamilyMember, self.member.pk)
+
+        self.member.name = "Beatriz"
+        self.member.save()
+
+        self.assertEqual(cache.get_instance(FamilyMember, self.member.pk).name, "Beatriz")
+
+    def test_unknown_member_is_rejected(self):
+        response = self.client.post('/api/transactions/', {
+            'due_date': '2025-01-15',
+            'description': 'Teste',
+            'total_amount': '10.00',
+            'type': 'expense',
+            'member': str(uuid.uuid4()),
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('member', response.json())
+
+
+class ConditionalGetTests(FamilyFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.transaction = self.make_transaction(total_amount=Decimal('10.00'))
+        self.transaction.post()
+
+    def test_list_returns_304_until_data_changes(self):
+        first = self.client.get('/api/expenses/')
+        etag = first['ETag']
+        self.assertFalse(first.has_header('Last-Modified'))
+
+        # Apenas a consulta de versão (contagem + max(updated_at))
+        with self.assertNumQueries(1):
+            cached = self.client.get('/api/expenses/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+
+        Expense.objects.get().clear()
+        changed = self.client.get('/api/expenses/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+
+    def test_list_ignores_if_modified_since_after_delete(self):
+        other = Transaction.objects.create(due_date=date(2025, 1, 10), description='Outra', total_amount=Decimal('5.00'),
+                                           type='expense', member=self.transaction.member, tag=self.transaction.tag)
+        since = self.client.get(f'/api/transactions/{self.transaction.pk}/')['Last-Modified']
+        self.client.delete(f'/api/transactions/{other.pk}/')
+
+        # A exclusão não muda o maior updated_at; sem Last-Modified a lista não fica em cache
+        response = self.client.get('/api/transactions/', HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 1)
+
+    def test_detail_returns_304_for_matching_etag(self):
+        url = f'/api/transactions/{self.transaction.pk}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_renamed_tag_or_member_changes_etag(self):
+        url = f'/api/transactions/{self.transaction.pk}/'
+        list_etag = self.client.get('/api/transactions/')['ETag']
+        async_etag = self.client.get('/api/async/transactions/')['ETag']
+        detail_etag = self.client.get(url)['ETag']
+
+        tag = self.transaction.tag
+        tag.name = 'Mercado'
+        tag.save()
+        response = self.client.get('/api/transactions/', HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['tag_detail']['name'], 'Mercado')
+        self.assertEqual(self.client.get('/api/async/transactions/', HTTP_IF_NONE_MATCH=async_etag).status_code, 200)
+
+        member = self.transaction.member
+        member.name = 'Ana Maria'
+        member.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['member_detail']['name'], 'Ana Maria')
+
+
+class ImportTransactionsTests(TestCase):
+    def setUp(self):
+        self.member = FamilyMember.objects.create(name="Ana", relationship="mother")
+        self.tag = Tag.objects.create(name="Mercado", type="expense")
+        self.addCleanup(cache.clear)
+
+    def upload(self, content, **data):
+        return self.client.post('/api/transactions/import/', {
+            'file': SimpleUploadedFile('extrato', content.encode()),
+            **data,
+        })
+
+    def test_csv_import_reports_bad_rows_and_keeps_good_ones(self):
+        content = (
+            "due_date,description,total_amount,type,recurrence,total_installments,member,tag\n"
+            "2025-01-10,Feira,50.00,expense,one_time,,Ana,Mercado\n"
+            f"2025-01-11,Parcelado,90.00,expense,installment,3,{self.member.pk},\n"
+            "2025-01-12,Sem membro,10.00,expense,one_time,,Bruno,\n"
+            "2025-01-13,Parcelas erradas,10.00,expense,installment,,Ana,\n"
+        )
+        body = self.upload(content).json()
+
+        self.assertEqual(body['created'], 2)
+        self.assertEqual(body['failed'], 2)
+        self.assertEqual([error['row'] for error in body['errors']], [3, 4])
+        self.assertEqual(Transaction.objects.get(description='Feira').tag, self.tag)
+
+    def test_ofx_import(self):
+        content = (
+            "OFXHEADER:100\n<OFX><BANKMSGSRSV1><STMTTRSRS><STMTRS><BANKTRANLIST>\n"
+            "<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20250115120000<TRNAMT>-42.50<NAME>Padaria</STMTTRN>\n"
+            "<STMTTRN>\n<TRNTYPE>CREDIT\n<DTPOSTED>20250120\n<TRNAMT>1000.00\n<NAME>Salario\n</STMTTRN>\n"
+            "</BANKTRANLIST></STMTRS></STMTTRSRS></BANKMSGSRSV1></OFX>\n"
+        )
+        body = self.upload(content, format='ofx', member='ana').json()
+
+        self.assertEqual(body['created'], 2)
+        padaria = Transaction.objects.get(description='Padaria')
+        self.assertEqual((padaria.type, padaria.total_amount, padaria.due_date), ('expense', Decimal('42.50'), date(2025, 1, 15)))
+        self.assertEqual(Transaction.objects.get(description='Salario').type, 'income')
+
+
+class StreamingExportTests(FamilyFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        for day in [10, 20]:
+            self.make_transaction(due_date=date(2025, 1, day), total_amount=Decimal('12.50')).post()
+
+    def test_csv_export_streams_header_and_rows(self):
+        response = self.client.get('/api/expenses/export/?date_after=2025-01-15')
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(','), list(self.client.get('/api/expenses/').json()['results'][0]))
+        self.assertEqual(len(lines), 2)
+        self.assertIn('2025-01-20', lines[1])
+
+    def test_ndjson_export_matches_api_representation(self):
+        response = self.client.get('/api/expenses/export/?output=ndjson')
+        exported = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(exported, self.client.get('/api/expenses/').json()['results'])
+
+
+class RecurrenceTests(FamilyFixtures, TestCase):
+    def make_recurring(self, **kwargs):
+        data = {
+            'due_date': date(2025, 1, 31),
+            'description': 'Aluguel',
+            'total_amount': Decimal('1000.00'),
+            'recurrence': 'recurring',
+        }
+        data.update(kwargs)
+        return self.make_transaction(**data)
+
+    def test_add_months_clamps_day_and_crosses_year(self):
+        self.assertEqual(add_months(date(2025, 1, 31), 1), date(2025, 2, 28))
+        self.assertEqual(add_months(date(2024, 1, 31), 1), date(2024, 2, 29))
+        self.assertEqual(add_months(date(2025, 11, 15), 3), date(2026, 2, 15))
+
+    def test_monthly_occurrences_keep_original_day(self):
+        dates = list(occurrence_dates(date(2025, 1, 31), 'monthly', until=date(2025, 4, 30)))
+        self.assertEqual(dates, [date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 31), date(2025, 4, 30)])
+
+    def test_installments_cross_year_end(self):
+        transaction = self.make_recurring(due_date=date(2025, 11, 30), recurrence='installment', total_installments=4)
+        transaction.post()
+        self.assertEqual(
+            list(transaction.expenses.order_by('date').values_list('date', flat=True)),
+            [date(2025, 11, 30), date(2025, 12, 30), date(2026, 1, 30), date(2026, 2, 28)],
+        )
+
+    def test_post_materializes_window_and_command_advances_it(self):
+        transaction = self.make_recurring(frequency='weekly')
+        expenses, incomes = transaction.build_entries(until=date(2025, 2, 28))
+        self.assertEqual(len(expenses), 5)
+
+        Transaction.post_many(Transaction.objects.filter(pk=transaction.pk))
+        transaction.refresh_from_db()
+        created = Transaction.materialize_recurrences(until=add_months(transaction.materialized_until, 1))
+        self.assertGreater(created, 0)
+        self.assertEqual(Transaction.materialize_recurrences(until=add_months(transaction.materialized_until, 1)), 0)
+
+        dates = list(transaction.expenses.order_by('date').values_list('date', flat=True))
+        self.assertEqual(len(dates), len(set(dates)))
+        self.assertTrue(all((later - earlier).days == 7 for earlier, later in zip(dates, dates[1:])))
+
+    def test_post_many_keeps_window_of_transactions_due_after_it(self):
+        due_date = add_months(window_end(), 12)
+        transaction = self.make_recurring(due_date=due_date)
+        Transaction.post_many(Transaction.objects.filter(pk=transaction.pk))
+        transaction.refresh_from_db()
+        self.assertEqual(transaction.materialized_until, due_date)
+
+        Transaction.materialize_recurrences(until=add_months(due_date, 1))
+        self.assertEqual(list(transaction.expenses.order_by('date').values_list('date', flat=True)),
+                         [due_date, add_months(due_date, 1)])
+
+    def test_recurrence_end_stops_materialization(self):
+        transaction = self.make_recurring(recurrence_end=date(2025, 3, 31))
+        transaction.post()
+        self.assertEqual(transaction.expenses.count(), 3)
+        self.assertEqual(Transaction.materialize_recurrences(until=date(2030, 1, 1)), 0)
+
+    def test_occurrences_endpoint_projects_beyond_window(self):
+        transaction = self.make_recurring(due_date=date(2025, 1, 10), frequency='yearly')
+        transaction.post()
+        body = self.client.get(f'/api/transactions/{transaction.pk}/occurrences/?date_before=2030-12-31').json()
+
+        self.assertEqual([item['date'][:4] for item in body], [str(year) for year in range(2025, 2031)])
+        self.assertFalse(body[0]['projected'])
+        self.assertTrue(body[-1]['projected'])
+        self.assertIsNone(body[-1]['id'])
+
+
+class ClearBatchTests(FamilyFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        for day in [5, 10, 20]:
+            self.make_transaction(due_date=date(2025, 1, day), total_amount=Decimal('10.00')).post()
+
+    def test_clear_batch_by_filter_updates_status_and_rollup(self):
+        response = self.client.post(
+            '/api/expenses/clear_batch/',
+            {'status': 'pending', 'date_before': '2025-01-15'},
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.json(), {'cleared': 2})
+        self.assertEqual(Expense.objects.filter(status='cleared').count(), 2)
+        totals = dict(MonthlyRollup.objects.values_list('status', 'total'))
+        self.assertEqual(totals, {'pending': Decimal('10.00'), 'cleared': Decimal('20.00')})
+
+    def test_clear_batch_by_ids_skips_already_cleared(self):
+        first, second = Expense.objects.order_by('date')[:2]
+        first.clear()
+        response = self.client.post(
+            '/api/expenses/clear_batch/',
+            {'ids': [str(first.pk), str(second.pk)]},
+            content_type='application/json',
+        )
+        self.assertEqual(response.json(), {'cleared': 1})
+
+    def test_clear_saves_only_status(self):
+        expense = Expense.objects.first()
+        with CaptureQueriesContext(connection) as context:
+            expense.clear()
+        update = [query['sql'] for query in context.captured_queries if query['sql'].startswith('UPDATE "app_ff_expense"')]
+        self.assertEqual(len(update), 1)
+        self.assertNotIn('"amount"', update[0])
+
+
+class AsyncReadTests(FamilyFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        for day in [5, 10, 20]:
+            self.make_transaction(due_date=date(2025, 1, day), total_amount=Decimal('10.00')).post()
+
+    async def test_async_lists_match_sync_results(self):
+        for name in ['transactions', 'expenses', 'incomes']:
+            with self.subTest(name=name):
+                sync_body = (await self.async_client.get(f'/api/{name}/?page_size=2')).json()
+                async_response = await self.async_client.get(f'/api/async/{name}/?page_size=2')
+                self.assertEqual(async_response.json()['results'], sync_body['results'])
+                self.assertEqual(async_response.json()['next'] is None, sync_body['next'] is None)
+
+                etag = async_response['ETag']
+                cached = await self.async_client.get(f'/api/async/{name}/?page_size=2', headers={'If-None-Match': etag})
+                self.assertEqual(cached.status_code, 304)
+
+    async def test_async_lists_apply_filters_ordering_and_fields(self):
+        queries = {
+            'transactions': '?due_date_before=2025-01-15&ordering=-due_date&fields=id,due_date',
+            'expenses': '?date_after=2025-01-06&ordering=-date&fields=id,date,amount',
+            'incomes': '?status=cleared&fields=id',
+        }
+        for name, query in queries.items():
+            with self.subTest(name=name):
+                sync_body = (await self.async_client.get(f'/api/{name}/{query}')).json()
+                async_body = (await self.async_client.get(f'/api/async/{name}/{query}')).json()
+                self.assertEqual(async_body['results'], sync_body['results'])
+        body = (await self.async_client.get(f'/api/async/transactions/{queries["transactions"]}')).json()
+        self.assertEqual([row['due_date'] for row in body['results']], ['2025-01-10', '2025-01-05'])
+        self.assertEqual(set(body['results'][0]), {'id', 'due_date'})
+
+    async def test_async_lists_reject_invalid_params(self):
+        for query in ['?ordering=description', '?fields=bogus', '?due_date_after=bogus']:
+            with self.subTest(query=query):
+                sync_response = await self.async_client.get(f'/api/transactions/{query}')
+                async_response = await self.async_client.get(f'/api/async/transactions/{query}')
+                self.assertEqual(async_response.status_code, 400)
+                self.assertEqual(async_response.json(), sync_response.json())
+
+    async def test_async_summary_matches_sync(self):
+        sync_body = (await self.async_client.get('/api/summary/?date_before=2025-01-15')).json()
+        async_body = (await self.async_client.get('/api/async/summary/?date_before=2025-01-15')).json()
+        self.assertEqual(async_body, sync_body)
+
+    async def test_async_invalid_cursor_returns_404(self):
+        response = await self.async_client.get('/api/async/expenses/?cursor=bogus')
+        self.assertEqual(response.status_code, 404)
+
+
+class DatabaseSettingsTests(TestCase):
+    def test_sqlite_connection_pragmas(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("SQLite only")
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertGreater(cursor.fetchone()[0], 0)
+
+
+class InstrumentationTests(FamilyFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.make_transaction(total_amount=Decimal('10.00'))
+
+    def test_server_timing_header(self):
+        response = self.client.get('/api/transactions/')
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('ser;dur=', timing)
+        self.assertIn('total;dur=', timing)
+        self.assertNotIn('desc="0 queries"', timing)
+
+    def test_metrics_endpoint_exposes_histograms(self):
+        self.client.get('/api/transactions/')
+        body = self.client.get('/api/metrics/').content.decode()
+        self.assertIn('# TYPE app_ff_request_duration_seconds histogram', body)
+        self.assertIn('app_ff_db_queries_count{view="transaction-list",method="GET"}', body)
+        self.assertIn('app_ff_serialization_duration_seconds_bucket{view="transaction-list",method="GET",le="+Inf"}', body)
+
+    def test_slow_query_log(self):
+        with self.settings(APP_FF_SLOW_QUERY_MS=0), self.assertLogs('app_ff.slow_queries', 'WARNING') as logs:
+            list(Tag.objects.all())
+        self.assertIn('Slow query', logs.output[0])
+
+
+class SeedDataTests(TestCase):
+    def test_generate_is_reproducible_and_posts_every_recurrence(self):
+        transactions = generate(members=2, tags=3, transactions=12, seed=7)
+        self.assertEqual({t.recurrence for t in transactions}, {'one_time', 'recurring', 'installment'})
+        self.assertFalse(Transaction.objects.filter(status='pending').exists())
+        self.assertTrue(Expense.objects.exists())
+        self.assertTrue(Income.objects.exists())
+
+        amounts = [t.total_amount for t in transactions]
+        Transaction.objects.all().delete()
+        self.assertEqual([t.total_amount for t in generate(members=2, tags=3, transactions=12, seed=7)], amounts)
+
+    def test_benchmark_run_rolls_back(self):
+        generate(members=2, tags=3, transactions=12, seed=7)
+        expenses = Expense.objects.filter(status='pending').count()
+        case = next(item for item in BENCHMARKS if item.name == 'clear.batch' and item.params['model'] is Expense)
+        result = case.run(repeat=2)
+        self.assertEqual(result['operations'], min(expenses, 100))
+        self.assertEqual(result['params']['model'], 'Expense')
+        self.assertEqual(Expense.objects.filter(status='pending').count(), expenses)
+
+
+class FastJSONRendererTests(TestCase):
+    payload = {
+        'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'amount': Decimal('10.50'),
+        'date': date(2025, 1, 31),
+        'utc': datetime(2025, 1, 31, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+        'local': datetime(2025, 1, 31, 9, 30, tzinfo=zoneinfo.ZoneInfo('America/Sao_Paulo')),
+        'naive': datetime(2025, 1, 31, 9, 30),
+        'text': 'Padaria São João \u2028 linha \u2029',
+        'label': gettext_lazy('Other'),
+        'items': [1, 2.5, None, True, {'nested': 'ok'}],
+    }
+
+    def test_matches_drf_renderer(self):
+        self.assertEqual(FastJSONRenderer().render(self.payload), JSONRenderer().render(self.payload))
+
+    def test_indent_and_missing_orjson_use_drf_renderer(self):
+        expected = JSONRenderer().render(self.payload, 'application/json; indent=4')
+        self.assertEqual(FastJSONRenderer().render(self.payload, 'application/json; indent=4'), expected)
+        with mock.patch('app_ff.renderers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render(self.payload), JSONRenderer().render(self.payload))
+
+    def test_parser(self):
+        parser = FastJSONParser()
+        self.assertEqual(parser.parse(io.BytesIO('{"a": [1, "ç"]}'.encode())), {'a': [1, 'ç']})
+        with self.assertRaises(ParseError):
+            parser.parse(io.BytesIO(b'{"a": NaN}'))
+
+
+class QueryParamsTests(TestCase):
+    def setUp(self):
+        generate(members=2, tags=3, transactions=24, seed=5)
+
+    def test_filters_and_ordering(self):
+        response = self.client.get('/api/expenses/', {
+            'status': 'pending', 'date_after': '2000-01-01', 'ordering': '-date', 'page_size': 1000,
+        })
+        dates = [row['date'] for row in response.json()['results']]
+        self.assertEqual(len(dates), Expense.objects.filter(status='pending').count())
+        self.assertEqual(dates, sorted(dates, reverse=True))
+
+        member = FamilyMember.objects.first()
+        response = self.client.get('/api/transactions/', {'member': member.pk, 'type': 'expense', 'page_size': 1000})
+        self.assertEqual(
+            {row['id'] for row in response.json()['results']},
+            {str(pk) for pk in Transaction.objects.filter(member=member, type='expense').values_list('pk', flat=True)},
+        )
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get('/api/expenses/', {'ordering': 'amount'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/expenses/', {'fields': 'id,missing'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/transactions/', {'status': 'unknown'}).status_code, 400)
+
+    def test_sparse_fieldsets_narrow_the_select(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/expenses/', {'fields': 'id,amount', 'ordering': '-date', 'page_size': 2})
+        self.assertEqual(list(response.json()['results'][0]), ['id', 'amount'])
+        self.assertNotIn('"transaction_id"', context.captured_queries[-1]['sql'])
+
+        # A próxima página continua funcionando sem a coluna da ordenação na saída
+        next_page = self.client.get(response.json()['next']).json()['results']
+        self.assertEqual(len(next_page), 2)
+
+        transaction = Transaction.objects.first()
+        with self.assertNumQueries(1):
+            data = self.client.get(f'/api/transactions/{transaction.pk}/', {'fields': 'description,tag_detail'}).json()
+        self.assertEqual(data, {
+            'description': transaction.description,
+            'tag_detail': {'id': str(transaction.tag.id), 'name': transaction.tag.name, 'type': transaction.tag.type},
+        })
+
+
+class ForecastTests(FamilyFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(cache.clear)
+
+    def test_projection_applies_posting_rules(self):
+        self.make_transaction(due_date=date(2025, 1, 10), total_amount=Decimal('50.00'))
+        self.make_transaction(due_date=date(2025, 1, 31), total_amount=Decimal('100.00'), recurrence='installment', total_installments=3)
+        self.make_transaction(due_date=date(2025, 2, 5), total_amount=Decimal('1000.00'), type='income')
+        self.make_transaction(due_date=date(2025, 1, 15), total_amount=Decimal('20.00'), recurrence='recurring', frequency='weekly',
+                    recurrence_end=date(2025, 2, 5))
+        posted = self.make_transaction(due_date=date(2024, 11, 20), total_amount=Decimal('30.00'), recurrence='recurring')
+        Transaction.post_many(Transaction.objects.filter(pk=posted.pk))
+        Expense.objects.filter(transaction=posted, date__lt=date(2025, 1, 1)).update(status='cleared')
+
+        result = forecast.project(months=2, start=date(2025, 1, 1))
+        self.assertEqual([point['date'] for point in result['points']], [date(2025, 1, 1), date(2025, 2, 1), date(2025, 3, 1)])
+        # Janeiro: 50 + 33.33 + 3 semanais de 20 + 30 recorrente; fevereiro: 33.33 + 20 + 30 contra 1000 de receita
+        self.assertEqual(
+            [(point['income'], point['expense'], point['balance']) for point in result['points']],
+            [('0.00', '173.33', '-173.33'), ('1000.00', '83.33', '743.34'), ('0.00', '0.00', '743.34')],
+        )
+
+        daily = forecast.project(months=2, start=date(2025, 1, 1), granularity='daily')
+        with mock.patch.object(forecast, 'np', None):
+            self.assertEqual(forecast.project(months=2, start=date(2025, 1, 1)), result)
+            self.assertEqual(forecast.project(months=2, start=date(2025, 1, 1), granularity='daily'), daily)
+        self.assertEqual(daily['points'][-1]['balance'], '743.34')
+
+    def test_endpoint_is_cached_until_data_changes(self):
+        self.make_transaction(due_date=timezone.localdate(), total_amount=Decimal('10.00'))
+        url = f'/api/forecast/?member={self.member.pk}&months=3&granularity=daily'
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.client.get(url).json()
+        self.assertEqual(first['points'][0]['expense'], '10.00')
+
+        # Só as consultas da versão (transações, despesas e receitas)
+        with self.assertNumQueries(3):
+            self.assertEqual(self.client.get(url).json(), first)
+
+        self.make_transaction(due_date=timezone.localdate(), total_amount=Decimal('5.00'))
+        self.assertEqual(self.client.get(url).json()['points'][0]['expense'], '15.00')
+        self.assertEqual(self.client.get('/api/forecast/?months=61').status_code, 400)
+
+    def test_cache_is_shared_across_opening_balances_and_separate_from_references(self):
+        self.make_transaction(due_date=timezone.localdate(), total_amount=Decimal('10.00'))
+        url = f'/api/forecast/?member={self.member.pk}&months=3'
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.client.get(url).json()
+
+        # O saldo inicial não faz parte da chave: a mesma projeção é deslocada
+        with self.assertNumQueries(3):
+            shifted = self.client.get(url + '&opening_balance=100.50').json()
+        self.assertEqual(shifted['opening_balance'], '100.50')
+        self.assertEqual(
+            [Decimal(point['balance']) for point in shifted['points']],
+            [Decimal(point['balance']) + Decimal('100.50') for point in first['points']],
+        )
+        self.assertEqual([point['expense'] for point in shifted['points']], [point['expense'] for point in first['points']])
+
+        self.assertEqual(len(cache.get_cache('forecast')._data), 1)
+        self.assertFalse(any(key.startswith('forecast:') for key in cache.get_cache()._data))
+
+
+class JobQueueTests(FamilyFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.transaction = self.make_transaction(total_amount=Decimal('90.00'), recurrence='installment', total_installments=3)
+
+    def test_async_post_returns_202_and_worker_posts(self):
+        response = self.client.post(f'/api/transactions/{self.transaction.pk}/post_transaction/',
+                                    HTTP_PREFER='respond-async', HTTP_IDEMPOTENCY_KEY='post-1')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['status'], 'queued')
+        self.assertFalse(Expense.objects.exists())
+
+        # A mesma chave devolve a mesma tarefa, sem enfileirar de novo
+        again = self.client.post(f'/api/transactions/{self.transaction.pk}/post_transaction/',
+                                 HTTP_PREFER='respond-async', HTTP_IDEMPOTENCY_KEY='post-1')
+        self.assertEqual(again.json()['id'], response.json()['id'])
+        self.assertEqual(Job.objects.count(), 1)
+
+        self.assertEqual(jobs.work('test', burst=True), 1)
+        job = self.client.get(response['Location']).json()
+        self.assertEqual((job['status'], job['result']['result'], job['attempts']), ('succeeded', 'posted', 1))
+        self.assertEqual(Expense.objects.filter(transaction=self.transaction).count(), 3)
+
+        # Reaproveitar a chave para outra ação é um conflito
+        conflict = self.client.post('/api/transactions/post_batch/', {'ids': [str(self.transaction.pk)]},
+                                    content_type='application/json', HTTP_PREFER='respond-async', HTTP_IDEMPOTENCY_KEY='post-1')
+        self.assertEqual(conflict.status_code, 409)
+
+    def test_async_batches_are_validated_before_enqueueing(self):
+        self.assertEqual(self.client.post('/api/transactions/post_batch/', {}, content_type='application/json',
+                                          HTTP_PREFER='respond-async').status_code, 400)
+        self.client.post('/api/transactions/post_batch/', {'ids': [str(self.transaction.pk), str(uuid.uuid4())]},
+                         content_type='application/json', HTTP_PREFER='respond-async')
+        jobs.work('test', burst=True)
+        self.client.post('/api/expenses/clear_batch/', {'status': 'pending'}, content_type='application/json',
+                         HTTP_PREFER='respond-async')
+        self.client.post('/api/rollups/rebuild/')
+        self.assertEqual(jobs.work('test', burst=True), 2)
+
+        results = {job.kind: job.result for job in Job.objects.all()}
+        self.assertEqual(results['post_batch']['posted'], 1)
+        self.assertEqual([item['result'] for item in results['post_batch']['results']], ['posted', 'not_found'])
+        self.assertEqual(results['clear_batch'], {'cleared': 3})
+        self.assertEqual(Expense.objects.filter(status='cleared').count(), 3)
+        self.assertGreater(results['rebuild_rollups']['rows'], 0)
+
+    def test_failures_are_retried_with_backoff(self):
+        job, _ = jobs.enqueue('rebuild_rollups')
+        with mock.patch.object(MonthlyRollup, 'rebuild', side_effect=RuntimeError('boom')):
+            self.assertEqual(jobs.work('test', burst=True), 1)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), ('queued', 1))
+            self.assertIn('boom', job.error)
+            self.assertGreater(job.run_after, timezone.now())
+
+            # Nas tentativas seguintes a tarefa esgota max_attempts e falha
+            for _ in range(2):
+                Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+                jobs.work('test', burst=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 3))
+
+        # Erros permanentes (ex: transação inexistente) falham sem novas tentativas
+        missing, _ = jobs.enqueue('post_transaction', {'id': uuid.uuid4()})
+        jobs.work('test', burst=True)
+        missing.refresh_from_db()
+        self.assertEqual((missing.status, missing.attempts), ('failed', 1))
+
+    def test_claim_takes_each_job_once_and_recovers_stale_ones(self):
+        job, _ = jobs.enqueue('rebuild_rollups')
+        self.assertEqual(jobs.claim('a').pk, job.pk)
+        self.assertIsNone(jobs.claim('b'))
+
+        # Worker "a" morreu: passado o timeout, outro worker pega a tarefa
+        Job.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(hours=1))
+        claimed = jobs.claim('b')
+        self.assertEqual((claimed.worker, claimed.attempts), ('b', 2))
+        # O resultado atrasado do worker "a" é descartado
+        job.refresh_from_db()
+        job.worker, job.attempts = 'a', 1
+        self.assertFalse(jobs.finish(job, status='succeeded'))
+
+    def test_worker_survives_database_errors(self):
+        job, _ = jobs.enqueue('rebuild_rollups')
+        claim = jobs.claim
+        with mock.patch.object(jobs, 'claim', side_effect=[OperationalError('database is locked'), claim('test'), None]), \
+                self.assertLogs('app_ff.jobs', 'ERROR') as logs:
+            self.assertEqual(jobs.work('test', burst=True, poll_interval=0), 1)
+        self.assertIn('database is locked', logs.output[0])
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'succeeded')
+
+    def test_run_workers_stops_all_workers_when_one_fails(self):
+        calls = []
+
+        def claim(worker):
+            calls.append(worker)
+            if len(calls) == 1:
+                raise RuntimeError('boom')
+            return None
+
+        # Sem o stop no finally, o comando esperaria para sempre pelo outro worker
+        with mock.patch.object(jobs, 'claim', side_effect=claim), self.assertRaisesMessage(RuntimeError, 'boom'):
+            call_command('run_workers', workers=2, poll_interval=0.01)
+
+
+class IdempotentPostingTests(FamilyFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.transaction = self.make_transaction(total_amount=Decimal('90.00'), recurrence='installment', total_installments=3)
+
+    def test_stale_instance_cannot_post_twice(self):
+        stale = Transaction.objects.get(pk=self.transaction.pk)
+        self.transaction.post()
+        with self.assertRaises(ValueError):
+            stale.post()
+        self.assertEqual(stale.status, 'posted')
+        self.assertEqual(Expense.objects.count(), 3)
+
+    def test_retry_with_same_key_replays_response(self):
+        url = f'/api/transactions/{self.transaction.pk}/post_transaction/'
+        first = self.client.post(url, HTTP_IDEMPOTENCY_KEY='retry-1')
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(1):
+            retry = self.client.post(url, HTTP_IDEMPOTENCY_KEY='retry-1')
+        self.assertEqual((retry.status_code, retry.json()), (200, first.json()))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Expense.objects.count(), 3)
+
+        # Sem a chave, a nova tentativa é rejeitada normalmente; a chave em outra requisição é um conflito
+        self.assertEqual(self.client.post(url).status_code, 400)
+        other = self.client.post('/api/expenses/clear_batch/', {'status': 'pending'}, content_type='application/json',
+                                 HTTP_IDEMPOTENCY_KEY='retry-1')
+        self.assertEqual(other.status_code, 409)
+
+        # Erros de validação desfazem a transação junto com a chave: a resposta não é
+        # guardada e o cliente pode corrigir o pedido e reenviar com a mesma chave
+        self.assertEqual(self.client.post('/api/transactions/post_batch/', {}, content_type='application/json',
+                                          HTTP_IDEMPOTENCY_KEY='retry-2').status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.filter(key='retry-2').exists())
+
+    def test_expired_key_runs_again(self):
+        url = '/api/expenses/clear_batch/'
+        self.transaction.post()
+        self.assertEqual(self.client.post(url, {'status': 'pending'}, content_type='application/json',
+                                          HTTP_IDEMPOTENCY_KEY='clear-1').json(), {'cleared': 3})
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(self.client.post(url, {'status': 'pending'}, content_type='application/json',
+                                          HTTP_IDEMPOTENCY_KEY='clear-1').json(), {'cleared': 0})
+
+    def test_purge_removes_only_expired_keys(self):
+        url = '/api/expenses/clear_batch/'
+        for key in ('old', 'fresh'):
+            self.client.post(url, {'status': 'pending'}, content_type='application/json', HTTP_IDEMPOTENCY_KEY=key)
+        IdempotencyKey.objects.filter(key='old').update(created_at=timezone.now() - timedelta(days=2))
+        out = io.StringIO()
+        call_command('purge_idempotency_keys', stdout=out)
+        self.assertIn('Deleted 1 expired', out.getvalue())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['fresh'])
+
+
+# Teste de carga com threads de verdade: cada thread usa a sua conexão, por isso roda
+# fora da transação do TestCase
+class ConcurrentPostingTests(FamilyFixtures, TransactionTestCase):
+    THREADS = 8
+
+    def run_concurrently(self, func, count):
+        barrier = threading.Barrier(count)
+        results = [None] * count
+
+        def target(index):
+            try:
+                barrier.wait()
+                results[index] = func(index)
+            except Exception as error:
+                results[index] = error
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=target, args=(index,)) for index in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_worker_reconnects_after_connection_is_dropped(self):
+        job, _ = jobs.enqueue('rebuild_rollups')
+        connection.ensure_connection()
+        connection.connection.close()  # Conexão derrubada por fora (ex: reinício do banco)
+
+        # Sem reconectar, o worker tentaria para sempre: o stop encerra o teste nesse caso
+        stop = threading.Event()
+        timer = threading.Timer(5, stop.set)
+        timer.start()
+        try:
+            processed = jobs.work('test', burst=True, poll_interval=0, stop=stop)
+        finally:
+            timer.cancel()
+        self.assertEqual(processed, 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'succeeded')
+
+    def test_concurrent_posts_create_entries_once(self):
+        transactions = [self.make_transaction(description=f'Teste {i}', recurrence='installment', total_installments=4)
+                        for i in range(5)]
+
+        def post(index):
+            # Todas as threads postam as mesmas transações, cada uma com a sua instância
+            outcomes = []
+            for transaction in Transaction.objects.filter(pk__in=[t.pk for t in transactions]).order_by('description'):
+                try:
+                    transaction.post()
+                    outcomes.append('posted')
+                except ValueError:
+                    outcomes.append('rejected')
+            return outcomes
+
+        results = self.run_concurrently(post, self.THREADS)
+        self.assertFalse([result for result in results if isinstance(result, Exception)], results)
+        self.assertEqual(sum(outcomes.count('posted') for outcomes in results), len(transactions))
+        self.assertEqual(Expense.objects.count(), 4 * len(transactions))
+        self.assertEqual(MonthlyRollup.objects.filter(status='pending').aggregate(total=Sum('total'))['total'], Decimal('500.00'))
+
+        # Mesma Idempotency-Key em paralelo: uma execução, todas com a mesma resposta
+        batch = self.make_transaction(description='Lote', total_amount=Decimal('10.00'))
+
+        def retry(index):
+            response = Client().post(f'/api/transactions/{batch.pk}/post_transaction/', HTTP_IDEMPOTENCY_KEY='stress')
+            return response.status_code, response.json()
+
+        results = self.run_concurrently(retry, self.THREADS)
+        self.assertEqual(set(map(str, results)), {str((200, {'message': 'Transaction posted successfully'}))}, results)
+        self.assertEqual(Expense.objects.filter(transaction=batch).count(), 1)
+
+
+class MemberBalanceTests(FamilyFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = FamilyMember.objects.create(name="Bia", relationship="daughter")
+
+    def totals(self, member):
+        return tuple(getattr(MemberBalance.objects.get(pk=member.pk), field) for field in MemberBalance.TOTAL_FIELDS)
+
+    def test_balance_follows_create_post_and_clear(self):
+        installment = self.make_transaction(recurrence='installment', total_installments=4)
+        income = self.make_transaction(type='income', total_amount=Decimal('250.00'))
+        other = self.make_transaction(member=self.other, total_amount=Decimal('30.00'))
+        Transaction.objects.bulk_create([Transaction(due_date=date(2025, 2, 1), description='Importada', total_amount=Decimal('40.00'),
+                                                     type='expense', member=self.member, tag=self.tag)])
+        # Colunas na ordem de TOTAL_FIELDS: receitas (pendente, postado, concluído) e despesas
+        self.assertEqual(self.totals(self.member), (250, 0, 0, 140, 0, 0))
+
+        installment.post()
+        income.post()
+        Transaction.post_many(Transaction.objects.filter(pk=other.pk))
+        self.assertEqual(self.totals(self.member), (0, 250, 0, 40, 100, 0))
+
+        Expense.objects.filter(transaction__member=self.member).first().clear()
+        clear_entries(Income.objects.all())
+        self.assertEqual(self.totals(self.member), (0, 0, 250, 40, 75, 25))
+        self.assertEqual(self.totals(self.other), (0, 0, 0, 0, 30, 0))
+        self.assertEqual(MemberBalance.drift(), [])
+
+    def test_dashboard_is_a_primary_key_lookup(self):
+        self.make_transaction().post()
+        with self.assertNumQueries(1):
+            data = self.client.get(f'/api/balances/{self.member.pk}/').json()
+        self.assertEqual((data['member'], data['expense_posted'], data['income_cleared']), (str(self.member.pk), '100.00', '0.00'))
+
+        # Membro sem lançamentos tem saldo zero; membro inexistente, 404
+        self.assertEqual(self.client.get(f'/api/balances/{self.other.pk}/').json()['expense_pending'], '0.00')
+        self.assertEqual(self.client.get(f'/api/balances/{uuid.uuid4()}/').status_code, 404)
+        self.assertEqual(self.client.get('/api/balances/not-a-uuid/').status_code, 404)
+
+    def test_check_command_reports_and_fixes_drift(self):
+        self.make_transaction().post()
+        Expense.objects.update(amount=Decimal('90.00'))  # Alteração por fora do post()/clear()
+
+        out = io.StringIO()
+        with self.assertRaises(CommandError):
+            call_command('check_balances', stdout=out)
+        self.assertIn(f'{self.member.pk} expense_posted: stored 100.00, expected 90.00', out.getvalue())
+
+        call_command('check_balances', '--fix', stdout=io.StringIO())
+        self.assertEqual(MemberBalance.objects.get(pk=self.member.pk).expense_posted, Decimal('90.00'))
+        self.assertEqual(MemberBalance.drift(), [])
+
+    def test_amounts_given_as_str_or_float_are_counted(self):
+        self.make_transaction(total_amount='100.00')
+        self.make_transaction(total_amount=10.5)
+        Transaction.objects.bulk_create([Transaction(due_date=date(2025, 1, 15), description='Importada', total_amount='4.25',
+                                                     type='expense', member=self.member, tag=self.tag)])
+        self.assertEqual(MemberBalance.objects.get(pk=self.member.pk).expense_pending, Decimal('114.75'))
+        self.assertEqual(MemberBalance.drift(), [])
+
+    def test_deletes_are_removed_from_balance(self):
+        self.make_transaction(recurrence='installment', total_installments=4).post()
+        self.make_transaction(total_amount=Decimal('30.00'))
+        other_tag = Tag.objects.create(name="Lazer", type="expense")
+        kept = self.make_transaction(tag=other_tag, total_amount=Decimal('20.00'))
+        kept.post()
+        Expense.objects.filter(transaction=kept).first().clear()
+
+        # Remover a tag remove em cascata transações, despesas e resumo mensal
+        self.assertEqual(self.client.delete(f'/api/tags/{self.tag.pk}/').status_code, 204)
+        self.assertEqual(self.totals(self.member), (0, 0, 0, 0, 0, 20))
+        self.assertEqual(MemberBalance.drift(), [])
+
+        # Despesa removida diretamente e transação pendente removida pela API
+        Expense.objects.filter(transaction=kept).delete()
+        pending = self.make_transaction(tag=other_tag, total_amount=Decimal('15.00'))
+        self.assertEqual(self.client.delete(f'/api/transactions/{pending.pk}/').status_code, 204)
+        self.assertEqual(self.totals(self.member), (0, 0, 0, 0, 0, 0))
+        self.assertEqual(MemberBalance.drift(), [])
+
+    def test_edits_move_balance(self):
+        pending = self.make_transaction()
+        posted = self.make_transaction(recurrence='installment', total_installments=2)
+        posted.post()
+        other_tag = Tag.objects.create(name="Lazer", type="expense")
+
+        url = f'/api/transactions/{pending.pk}/'
+        payload = self.client.get(url).json()
+        payload.update(total_amount='60.00', member=str(self.other.pk))
+        self.assertEqual(self.client.put(url, payload, content_type='application/json').status_code, 200)
+        self.assertEqual(self.client.patch(url, {'total_amount': '70.00'}, content_type='application/json').status_code, 200)
+        self.assertEqual(self.totals(self.member), (0, 0, 0, 0, 100, 0))
+        self.assertEqual(self.totals(self.other), (0, 0, 0, 70, 0, 0))
+
+        # Em uma transação postada, as despesas vão para o novo membro e a nova tag
+        response = self.client.patch(f'/api/transactions/{posted.pk}/', {'member': str(self.other.pk), 'tag': str(other_tag.pk)},
+                                     content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.totals(self.member), (0, 0, 0, 0, 0, 0))
+        self.assertEqual(self.totals(self.other), (0, 0, 0, 70, 100, 0))
+        self.assertEqual(MemberBalance.drift(), [])
+
+        rollups = sorted(MonthlyRollup.objects.values_list('month', 'member', 'tag', 'type', 'status', 'total', 'count'))
+        MonthlyRollup.rebuild()
+        self.assertEqual(rollups, sorted(MonthlyRollup.objects.values_list('month', 'member', 'tag', 'type', 'status', 'total', 'count')))
+
+    def test_balance_created_concurrently_is_incremented(self):
+        MemberBalance.objects.create(member=self.member, expense_posted=Decimal('5.00'))
+
+        # Simula outra transação que criou o saldo depois do primeiro SELECT
+        lock_rows = MemberBalance.lock_rows
+        with mock.patch.object(MemberBalance, 'lock_rows', side_effect=[{}, lock_rows([self.member.pk])]):
+            MemberBalance.apply_deltas({(date(2025, 1, 1), self.member.pk, self.tag.pk, 'expense', 'pending'): (Decimal('10.00'), 2)})
+
+        self.assertEqual(MemberBalance.objects.get(pk=self.member.pk).expense_posted, Decimal('15.00'))
+
+
+# Testes de propriedades da divisão em parcelas com entradas aleatórias (seed fixo,
+# para serem reproduzíveis)
+class InstallmentPlanTests(FamilyFixtures, TestCase):
+    CASES = 2000
+
+    def random_cases(self, seed):
+        rng = random.Random(seed)
+        return [(rng.choice([1, -1]) * rng.randint(0, 10 ** rng.randint(1, 10)), rng.randint(1, 360)) for _ in range(self.CASES)]
+
+    def test_split_properties(self):
+        for total, count in self.random_cases(0):
+            base, last = installments.split(total, count)
+            # A soma é exata, a última parcela leva o resto (menor que uma parcela por centavo)
+            # e o sinal acompanha o total
+            self.assertEqual(base * (count - 1) + last, total, (total, count))
+            self.assertTrue(0 <= abs(last) - abs(base) < count, (total, count))
+            self.assertTrue(base * total >= 0 and last * total >= 0, (total, count))
+            self.assertEqual(installments.split(-total, count), (-base, -last))
+
+    def installment_amounts(self, total, count):
+        # Valores (Decimal) de todas as parcelas de uma transação, na ordem
+        base, last = installments.split(installments.to_cents(total), count)
+        return [installments.from_cents(base)] * (count - 1) + [installments.from_cents(last)]
+
+    def test_batch_plan_matches_split(self):
+        cases = self.random_cases(1)
+        totals, counts = [total for total, _ in cases], [count for _, count in cases]
+        expected = [installments.split(total, count) for total, count in cases]
+        self.assertEqual(list(zip(*installments.plan(totals, counts))), expected)
+        with mock.patch.object(installments, 'np', None):
+            self.assertEqual(list(zip(*installments.plan(totals, counts))), expected)
+        self.assertEqual(installments.plan([], []), ([], []))
+
+    def test_posted_installments_sum_to_total(self):
+        rng = random.Random(2)
+        transactions = [
+            self.make_transaction(due_date=date(2025, 1, 31), description=f'Parcelada {i}',
+                                  total_amount=Decimal(rng.randint(1, 10 ** 7)) / 100, recurrence='installment',
+                                  total_installments=rng.randint(2, 24))
+            for i in range(40)
+        ]
+        transactions[0].post()
+        Transaction.post_many(Transaction.objects.filter(pk__in=[t.pk for t in transactions[1:]]))
+
+        totals = dict(Expense.objects.values_list('transaction').annotate(total=Sum('amount')).order_by())
+        for transaction in transactions:
+            self.assertEqual(totals[transaction.pk], transaction.total_amount)
+        amounts = list(Expense.objects.filter(transaction=transactions[0]).order_by('current_installment').values_list('amount', flat=True))
+        self.assertEqual(amounts, self.installment_amounts(transactions[0].total_amount, transactions[0].total_installments))
+        self.assertEqual(len(set(amounts[:-1])), 1)
+
+        # 100.00 em 3: 33.33 + 33.33 + 33.34 (antes, 3 x 33.33 = 99.99)
+        self.assertEqual(self.installment_amounts(Decimal('100.00'), 3), [Decimal('33.33'), Decimal('33.33'), Decimal('33.34')])
@@ -1,6 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import TransactionViewSet, ExpenseViewSet, IncomeViewSet, TagViewSet, FamilyMemberViewSet
+from . import async_views, instrumentation
+from .views import TransactionViewSet, ExpenseViewSet, IncomeViewSet, TagViewSet, FamilyMemberViewSet, SummaryViewSet, MonthlyRollupViewSet, ForecastViewSet, JobViewSet, MemberBalanceViewSet
 
 router = DefaultRouter()
 router.register(r'transactions', TransactionViewSet)
@@ -8,7 +9,19 @@ router.register(r'expenses', ExpenseViewSet)
 router.register(r'incomes', IncomeViewSet)
 router.register(r'tags', TagViewSet)
 router.register(r'family-members', FamilyMemberViewSet)
+router.register(r'summary', SummaryViewSet, basename='summary')
+router.register(r'rollups', MonthlyRollupViewSet)
+router.register(r'forecast', ForecastViewSet, basename='forecast')
+router.register(r'jobs', JobViewSet)
+router.register(r'balances', MemberBalanceViewSet)
 
 urlpatterns = [
+    # Rotas assíncronas (somente leitura) para rodar sob ASGI
+    path('async/transactions/', async_views.transaction_list, name='async-transaction-list'),
+    path('async/expenses/', async_views.expense_list, name='async-expense-list'),
+    path('async/incomes/', async_views.income_list, name='async-income-list'),
+    path('async/summary/', async_views.summary, name='async-summary'),
+    # Métricas no formato Prometheus
+    path('metrics/', instrumentation.metrics_view, name='metrics'),
     path('', include(router.urls)),
 ]
@@ -1,20 +1,72 @@
+import copy
+import csv
+import io
+import json
+import uuid
+from decimal import Decimal
+
 # Importações da biblioteca do Django REST Framework
-from rest_framework import serializers, viewsets, status
+from rest_framework import generics, serializers, viewsets, status
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from rest_framework.settings import ISO_8601, api_settings
+
+# Funções de agregação do ORM usadas no resumo mensal
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import TruncMonth
 
 # Função utilitária do Django para buscar um objeto ou retornar erro 404
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, ObjectDoesNotExist
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 
+# Utilitários de requisições condicionais (ETag / Last-Modified)
+from django.utils.cache import get_conditional_response
+from django.utils import timezone
+from django.utils.http import http_date, quote_etag
+
 # Importação dos modelos usados nesta API
-from .models import Transaction, Expense, Income, Tag, FamilyMember
+from . import cache, jobs
+from .instrumentation import InstrumentedViewMixin, measure_serialization
+from .models import Transaction, Expense, Income, Tag, FamilyMember, MonthlyRollup, MemberBalance, Job, STATUS_CHOICES, TYPE_CHOICES, clear_entries, get_default_tag
+from .forecast import GRANULARITIES, cached_projection
+from .idempotency import idempotent
+from .recurrence import window_end
 
 # -------------------- SERIALIZERS --------------------
 
+# Horizonte máximo da projeção do fluxo de caixa (5 anos)
+MAX_FORECAST_MONTHS = 60
+
+# Campo de chave estrangeira que resolve o pk pelo cache de referência (tags e membros)
+class CachedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    def to_internal_value(self, data):
+        try:
+            pk = uuid.UUID(str(data))
+        except ValueError:
+            # Valor inválido: deixa o campo padrão gerar a mesma mensagem de erro
+            return super().to_internal_value(data)
+        try:
+            return cache.get_instance(self.get_queryset().model, pk)
+        except ObjectDoesNotExist:
+            self.fail('does_not_exist', pk_value=data)
+
 class TransactionSerializer(serializers.ModelSerializer):
+    member = CachedPrimaryKeyRelatedField(queryset=FamilyMember.objects.all())
+    tag = CachedPrimaryKeyRelatedField(queryset=Tag.objects.all(), required=False)
     tag_detail = serializers.SerializerMethodField()
     member_detail = serializers.SerializerMethodField()
 
+    # Colunas relacionadas que a leitura rápida (ValuesReader) usa para montar os
+    # mesmos dicts de get_tag_detail e get_member_detail
+    values_details = {
+        'tag_detail': ('tag', ['id', 'name', 'type']),
+        'member_detail': ('member', ['id', 'name']),
+    }
+
     class Meta:
         model = Transaction
         fields = '__all__'  # Inclui os campos normais
@@ -61,17 +113,130 @@ class TransactionSerializer(serializers.ModelSerializer):
                 'total_installments': 'Recurring transactions cannot have installments.'
             })
 
-        if 'member' not in data:
+        recurrence_end = data.get('recurrence_end')
+        if recurrence_end and data.get('due_date') and recurrence_end < data['due_date']:
+            raise serializers.ValidationError({
+                'recurrence_end': 'Recurrence end must be on or after the due date.'
+            })
+
+        # Em atualizações parciais (PATCH), o membro e a tag atuais são mantidos
+        if 'member' not in data and not self.partial:
             raise serializers.ValidationError({
                 'member': 'This field is required.'
             })
 
-        if 'tag' not in data:
-            data['tag'] = Tag.objects.get_or_create(name="Other", type="expense")[0]
+        if 'tag' not in data and not self.partial:
+            data['tag'] = cache.get_instance(Tag, get_default_tag())
+
+        return data
+
+
+
+# Serializer de entrada com os filtros de transações (usado na listagem e nas ações em lote)
+class TransactionFilterSerializer(serializers.Serializer):
+    due_date_after = serializers.DateField(required=False)
+    due_date_before = serializers.DateField(required=False)
+    type = serializers.ChoiceField(choices=TYPE_CHOICES, required=False)
+    member = serializers.UUIDField(required=False)
+    tag = serializers.UUIDField(required=False)
+    status = serializers.ChoiceField(choices=STATUS_CHOICES, required=False)
+
+    def filter_queryset(self, queryset):
+        """
+        Aplica os filtros validados ao queryset informado.
+        """
+        data = self.validated_data
+        if 'due_date_after' in data:
+            queryset = queryset.filter(due_date__gte=data['due_date_after'])
+        if 'due_date_before' in data:
+            queryset = queryset.filter(due_date__lte=data['due_date_before'])
+        if 'type' in data:
+            queryset = queryset.filter(type=data['type'])
+        if 'member' in data:
+            queryset = queryset.filter(member_id=data['member'])
+        if 'tag' in data:
+            queryset = queryset.filter(tag_id=data['tag'])
+        if 'status' in data:
+            queryset = queryset.filter(status=data['status'])
+        return queryset
+
+# Serializer de entrada para as ações em lote: recebe uma lista de IDs e/ou filtros
+class TransactionBatchSerializer(TransactionFilterSerializer):
+    ids = serializers.ListField(child=serializers.UUIDField(), required=False, allow_empty=False)
 
+    def validate(self, data):
+        if not data:
+            raise serializers.ValidationError('Provide a list of ids or at least one filter.')
         return data
 
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if 'ids' in self.validated_data:
+            queryset = queryset.filter(pk__in=self.validated_data['ids'])
+        return queryset
+
+# Serializer de entrada com os filtros de despesas e receitas (usado no resumo e na exportação)
+class EntryFilterSerializer(serializers.Serializer):
+    date_after = serializers.DateField(required=False)
+    date_before = serializers.DateField(required=False)
+    member = serializers.UUIDField(required=False)
+    tag = serializers.UUIDField(required=False)
+    status = serializers.ChoiceField(choices=STATUS_CHOICES, required=False)
+
+    def filter_queryset(self, queryset):
+        data = self.validated_data
+        if 'date_after' in data:
+            queryset = queryset.filter(date__gte=data['date_after'])
+        if 'date_before' in data:
+            queryset = queryset.filter(date__lte=data['date_before'])
+        if 'member' in data:
+            queryset = queryset.filter(transaction__member_id=data['member'])
+        if 'tag' in data:
+            queryset = queryset.filter(transaction__tag_id=data['tag'])
+        if 'status' in data:
+            queryset = queryset.filter(status=data['status'])
+        return queryset
+
+# Serializer de entrada para as ações em lote de despesas e receitas: IDs e/ou filtros
+class EntryBatchSerializer(EntryFilterSerializer):
+    ids = serializers.ListField(child=serializers.UUIDField(), required=False, allow_empty=False)
+
+    def validate(self, data):
+        if not data:
+            raise serializers.ValidationError('Provide a list of ids or at least one filter.')
+        return data
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if 'ids' in self.validated_data:
+            queryset = queryset.filter(pk__in=self.validated_data['ids'])
+        return queryset
+
+# Serializer de entrada com o intervalo de datas das ocorrências de uma transação
+class OccurrenceRangeSerializer(serializers.Serializer):
+    date_after = serializers.DateField(required=False)
+    date_before = serializers.DateField(required=False)
 
+# Serializer de saída das ocorrências: gravadas (despesas/receitas) ou projetadas (ainda não gravadas)
+class OccurrenceSerializer(serializers.Serializer):
+    id = serializers.SerializerMethodField()
+    date = serializers.DateField()
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2)
+    status = serializers.CharField()
+    projected = serializers.SerializerMethodField()
+
+    def get_id(self, obj):
+        return None if obj._state.adding else obj.id
+
+    def get_projected(self, obj):
+        return obj._state.adding
+
+# Serializer de entrada com os parâmetros da projeção do fluxo de caixa
+class ForecastSerializer(serializers.Serializer):
+    months = serializers.IntegerField(min_value=1, max_value=MAX_FORECAST_MONTHS, default=12)
+    granularity = serializers.ChoiceField(choices=GRANULARITIES, default='monthly')
+    member = serializers.UUIDField(required=False)
+    opening_balance = serializers.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0'))
 
 # Serializer para o modelo Expense
 class ExpenseSerializer(serializers.ModelSerializer):
@@ -99,12 +264,459 @@ class FamilyMemberSerializer(serializers.ModelSerializer):
         model = FamilyMember
         fields = '__all__'
 
+# Serializer para o modelo MonthlyRollup
+class MonthlyRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MonthlyRollup
+        fields = '__all__'
+
+class MemberBalanceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MemberBalance
+        fields = '__all__'
+
+# Serializer das tarefas em segundo plano (somente leitura)
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = ['id', 'kind', 'status', 'payload', 'result', 'error', 'attempts', 'max_attempts',
+                  'run_after', 'created_at', 'started_at', 'finished_at', 'updated_at']
+
+# -------------------- LEITURA RÁPIDA --------------------
+
+# Leitura das listagens sem instanciar modelos: busca as linhas com .values() (as
+# colunas de tag e membro vêm pelo JOIN) e converte cada coluna com o to_representation
+# do próprio campo do serializer, gerando exatamente o mesmo JSON
+class ValuesReader:
+    def __init__(self, serializer_class):
+        self.lookups = []
+        self.columns = []
+        self.extra = []
+        details = getattr(serializer_class, 'values_details', {})
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.SerializerMethodField):
+                if name not in details:
+                    raise ImproperlyConfigured(f"{serializer_class.__name__}.{name} has no entry in values_details.")
+                relation, keys = details[name]
+                lookups = {key: f'{relation}__{key}' for key in keys}
+                self.lookups.extend(lookups.values())
+                self.columns.append((name, relation, None, lookups))
+            else:
+                self.lookups.append(field.source)
+                self.columns.append((name, field.source, self.converter(field), None))
+
+    @staticmethod
+    def converter(field):
+        # Chaves estrangeiras saem como o pk, que é o próprio valor lido
+        if isinstance(field, serializers.RelatedField):
+            return None
+        # Datas/horas ISO com o fuso padrão: convertidas em represent(), que busca o fuso
+        # atual uma vez por listagem em vez de uma vez por linha
+        if (isinstance(field, serializers.DateTimeField) and settings.USE_TZ and not hasattr(field, 'timezone')
+                and getattr(field, 'format', api_settings.DATETIME_FORMAT) == ISO_8601):
+            return ISO_8601
+        return field.to_representation
+
+    def bind_columns(self):
+        current = timezone.get_current_timezone()
+
+        def convert_datetime(value):
+            # Mesmo resultado de DateTimeField.to_representation
+            value = value.astimezone(current).isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+        return [
+            (name, source, convert_datetime if convert == ISO_8601 else convert, lookups)
+            for name, source, convert, lookups in self.columns
+        ]
+
+    def subset(self, fields, extra=()):
+        """
+        Leitor só com os campos pedidos (?fields=). As colunas de "extra" (ex: as da
+        ordenação, usadas pelo cursor) são lidas do banco, mas não vão para a saída.
+        """
+        reader = copy.copy(self)
+        reader.columns = [column for column in self.columns if column[0] in fields]
+        reader.lookups = []
+        for name, source, convert, lookups in reader.columns:
+            reader.lookups.extend([source] if lookups is None else lookups.values())
+        reader.extra = [name for name in extra if name not in reader.lookups]
+        return reader
+
+    def queryset(self, queryset):
+        return queryset.values(*self.lookups, *self.extra)
+
+    def only(self, queryset):
+        """
+        Restringe com .only() as colunas de uma consulta que instancia o modelo (detalhe),
+        carregando pelo JOIN só as relações usadas nos campos de detalhe.
+        """
+        fields, related = list(self.extra), []
+        for name, source, convert, lookups in self.columns:
+            fields.append(source)
+            if lookups is not None:
+                related.append(source)
+                fields.extend(lookups.values())
+        return queryset.select_related(None).select_related(*related).only(*fields)
+
+    def to_representation(self, row, columns=None):
+        data = {}
+        for name, source, convert, lookups in columns or self.bind_columns():
+            if lookups is not None:
+                data[name] = None if row[lookups['id']] is None else {key: row[lookup] for key, lookup in lookups.items()}
+            else:
+                value = row[source]
+                data[name] = value if value is None or convert is None else convert(value)
+        return data
+
+    def represent(self, rows):
+        columns = self.bind_columns()
+        return [self.to_representation(row, columns) for row in rows]
+
+
+VALUES_READERS = {}
+
+
+def values_reader(serializer_class):
+    """
+    ValuesReader do serializer, montado uma única vez por classe.
+    """
+    reader = VALUES_READERS.get(serializer_class)
+    if reader is None:
+        reader = VALUES_READERS[serializer_class] = ValuesReader(serializer_class)
+    return reader
+
+# -------------------- RESUMOS --------------------
+
+# Colunas de agrupamento de cada dimensão do resumo: (campos do modelo, expressões nomeadas)
+SUMMARY_DIMENSIONS = {
+    'by_month': ((), {'month': TruncMonth('date')}),
+    'by_tag': ((), {'tag': F('transaction__tag'), 'tag_name': F('transaction__tag__name')}),
+    'by_member': ((), {'member': F('transaction__member'), 'member_name': F('transaction__member__name')}),
+    'by_status': (('status',), {}),
+}
+
+def summary_querysets(queryset):
+    """
+    Monta, para cada dimensão, um único SELECT ... GROUP BY com a soma e a
+    contagem das linhas do queryset (despesas ou receitas).
+    """
+    querysets = {}
+    for dimension, (fields, expressions) in SUMMARY_DIMENSIONS.items():
+        querysets[dimension] = (
+            queryset
+            .values(*fields, **expressions)
+            .annotate(total=Sum('amount'), count=Count('id'))
+            .order_by(*fields, *expressions)
+        )
+    return querysets
+
+def format_summary_row(row):
+    """
+    Formata o total com duas casas decimais, como os campos "amount" dos serializers.
+    """
+    row['total'] = f"{row['total']:.2f}"
+    return row
+
+def post_transactions(serializer):
+    """
+    Posta as transações pendentes selecionadas pelo TransactionBatchSerializer (já
+    validado) e retorna o resultado por ID. Usado pelo post_batch e pela tarefa em
+    segundo plano correspondente.
+    """
+    posted = Transaction.post_many(serializer.filter_queryset(Transaction.objects.all()))
+    results = [{'id': transaction.pk, 'result': 'posted'} for transaction in posted]
+
+    # IDs pedidos explicitamente que não foram postados: já postados, fora dos demais
+    # filtros do pedido (ainda pendentes) ou inexistentes
+    requested_ids = serializer.validated_data.get('ids', [])
+    posted_ids = {transaction.pk for transaction in posted}
+    skipped_ids = [pk for pk in dict.fromkeys(requested_ids) if pk not in posted_ids]
+    statuses = dict(Transaction.objects.filter(pk__in=skipped_ids).values_list('pk', 'status'))
+    for pk in skipped_ids:
+        if pk not in statuses:
+            result = 'not_found'
+        else:
+            result = 'skipped' if statuses[pk] == 'pending' else 'not_pending'
+        results.append({'id': pk, 'result': result})
+
+    return {'posted': len(posted), 'results': results}
+
+# -------------------- PARÂMETROS DAS LISTAGENS --------------------
+# Usados pelo QueryParamsMixin e pelas listagens assíncronas (async_views), para que as
+# duas versões aceitem os mesmos filtros, ?ordering= e ?fields=
+
+def parse_ordering(query_params, default, ordering_fields):
+    """
+    Ordenação pedida em ?ordering= (só campos de "ordering_fields"), com o id no final;
+    sem o parâmetro, "default".
+    """
+    param = query_params.get('ordering')
+    if not param:
+        return default
+    ordering = []
+    for field in filter(None, (field.strip() for field in param.split(','))):
+        if field.lstrip('-') not in ordering_fields:
+            raise serializers.ValidationError({'ordering': [f'Unsupported ordering field: {field.lstrip("-")}.']})
+        ordering.append(field)
+    if not ordering:
+        return default
+    # O id garante um keyset único; na mesma direção do último campo, usa o mesmo índice
+    return tuple(ordering) + ('-id' if ordering[-1].startswith('-') else 'id',)
+
+def parse_selected_fields(query_params, serializer_class):
+    """
+    Campos pedidos em ?fields= (None para todos); campos desconhecidos são um erro 400.
+    """
+    param = query_params.get('fields')
+    if not param:
+        return None
+    available = {column[0] for column in values_reader(serializer_class).columns}
+    fields = {field.strip() for field in param.split(',') if field.strip()}
+    unknown = sorted(fields - available)
+    if unknown:
+        raise serializers.ValidationError({'fields': [f'Unknown field: {name}.' for name in unknown]})
+    return fields or None
+
+def apply_list_filters(queryset, query_params, filter_serializer_class):
+    if filter_serializer_class is None:
+        return queryset
+    serializer = filter_serializer_class(data=query_params)
+    serializer.is_valid(raise_exception=True)
+    return serializer.filter_queryset(queryset)
+
+def list_reader(serializer_class, selected_fields, ordering):
+    reader = values_reader(serializer_class)
+    if selected_fields:
+        # As colunas da ordenação são lidas mesmo fora de ?fields= (o cursor usa seus valores)
+        reader = reader.subset(selected_fields, [field.lstrip('-') for field in ordering])
+    return reader
+
+def related_models(model, related_fields):
+    return [model._meta.get_field(name).related_model for name in related_fields]
+
+def format_version(prefix, stamps):
+    """
+    Versão de um recurso para o ETag: o prefixo (contagem ou ID) e os updated_at informados
+    (o do próprio recurso e os das relações embutidas na resposta).
+    """
+    return '-'.join([str(prefix)] + [str(stamp.timestamp() if stamp else 0) for stamp in stamps])
+
 # -------------------- VIEWSETS --------------------
 
+# Quantidade máxima de linhas com erro devolvidas pela importação
+MAX_REPORTED_IMPORT_ERRORS = 1000
+
+# Linhas buscadas por vez no banco durante a exportação
+EXPORT_CHUNK_SIZE = 2000
+
+# Buffer "falso" para o csv.writer: devolve a linha em vez de guardá-la
+class Echo:
+    def write(self, value):
+        return value
+
+# Mixin das ações que podem rodar em segundo plano: com o cabeçalho "Prefer: respond-async",
+# a ação é enfileirada (ver app_ff/jobs.py) e a resposta é 202 com a tarefa e o Location
+# para acompanhá-la. O cabeçalho Idempotency-Key evita enfileirar a mesma ação duas vezes.
+class BackgroundJobMixin:
+    def prefers_async(self, request):
+        return 'respond-async' in request.headers.get('Prefer', '')
+
+    def enqueue_job(self, request, kind, payload):
+        try:
+            job, created = jobs.enqueue(kind, payload, idempotency_key=request.headers.get('Idempotency-Key'))
+        except jobs.IdempotencyConflict:
+            return Response({'error': 'Idempotency-Key already used for a different request'}, status=status.HTTP_409_CONFLICT)
+        response = Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+        response['Location'] = reverse('job-detail', args=[job.pk], request=request)
+        return response
+
+# Mixin com a conclusão em lote de despesas e receitas
+class BatchClearMixin(BackgroundJobMixin):
+    @action(detail=False, methods=['post'])
+    @idempotent
+    def clear_batch(self, request):
+        """
+        Marca como concluídas, em lote, as linhas indicadas por IDs e/ou filtros
+        (ex: {"status": "pending", "date_before": "2025-01-31"}) e retorna a contagem.
+        Aceita "Prefer: respond-async" para rodar em segundo plano.
+        """
+        serializer = EntryBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if self.prefers_async(request):
+            model = 'expense' if self.queryset.model is Expense else 'income'
+            return self.enqueue_job(request, 'clear_batch', {'model': model, 'filters': serializer.data})
+        cleared = clear_entries(serializer.filter_queryset(self.get_queryset()))
+        return Response({'cleared': cleared})
+
+# Mixin com a exportação em streaming (CSV ou NDJSON) de despesas e receitas
+class StreamingExportMixin:
+    def export_converters(self, fields):
+        """
+        Conversores de cada coluna para o mesmo formato da API (datas ISO, decimais
+        com duas casas, UUIDs como texto), reutilizando os campos do serializer.
+        """
+        serializer_fields = self.get_serializer().fields
+        converters = []
+        for name in fields:
+            field = serializer_fields[name]
+            converters.append(str if isinstance(field, serializers.RelatedField) else field.to_representation)
+        return converters
+
+    def export_rows(self, queryset, fields):
+        converters = self.export_converters(fields)
+        rows = queryset.order_by(*self.ordering).values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        for row in rows:
+            yield [None if value is None else convert(value) for convert, value in zip(converters, row)]
+
+    @staticmethod
+    def csv_lines(fields, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow(row)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Exporta as linhas filtradas em streaming, sem montar a resposta em memória.
+        Aceita ?output=csv|ndjson e os filtros date_after, date_before, member, tag e status.
+        """
+        serializer = EntryFilterSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        output = request.query_params.get('output', 'csv')
+        if output not in ('csv', 'ndjson'):
+            return Response({'error': f'Unsupported output: {output}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        fields = list(self.get_serializer().fields)
+        rows = self.export_rows(serializer.filter_queryset(self.get_queryset()), fields)
+
+        if output == 'csv':
+            response = StreamingHttpResponse(self.csv_lines(fields, rows), content_type='text/csv')
+        else:
+            content = (json.dumps(dict(zip(fields, row))) + '\n' for row in rows)
+            response = StreamingHttpResponse(content, content_type='application/x-ndjson')
+
+        filename = f"{self.get_queryset().model._meta.model_name}s.{output}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+# Mixin com filtros, ordenação (?ordering=-date) e seleção de campos (?fields=id,amount,date)
+# pela query string. Os filtros valem para a listagem; os campos, para a listagem e o detalhe
+class QueryParamsMixin:
+    filter_serializer_class = None  # Serializer de entrada com os filtros da listagem
+    ordering_fields = ()  # Campos aceitos em ?ordering= (com índice; o id é sempre o desempate)
+    selected_fields = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.ordering = self.get_ordering()
+        self.selected_fields = self.get_selected_fields()
+
+    def get_ordering(self):
+        return parse_ordering(self.request.query_params, type(self).ordering, self.ordering_fields)
+
+    def get_selected_fields(self):
+        return parse_selected_fields(self.request.query_params, self.get_serializer_class())
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action == 'list':
+            queryset = apply_list_filters(queryset, self.request.query_params, self.filter_serializer_class)
+        return queryset
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.selected_fields and self.action == 'retrieve':
+            # updated_at (do recurso e das relações embutidas pedidas) é sempre lido: é a
+            # versão usada no ETag do detalhe
+            reader = values_reader(self.get_serializer_class()).subset(self.selected_fields)
+            related = [f'{source}__updated_at' for name, source, convert, lookups in reader.columns
+                       if lookups is not None and source in getattr(self, 'related_fields', ())]
+            queryset = reader.subset(self.selected_fields, ['updated_at'] + related).only(queryset)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if self.selected_fields and args and 'data' not in kwargs and not isinstance(serializer, serializers.ListSerializer):
+            for name in set(serializer.fields) - self.selected_fields:
+                serializer.fields.pop(name)
+        return serializer
+
+# Mixin que responde as listagens pela leitura rápida (ValuesReader), sem instanciar modelos
+class ValuesListMixin:
+    def get_values_reader(self):
+        return list_reader(self.get_serializer_class(), getattr(self, 'selected_fields', None), self.ordering)
+
+    def list(self, request, *args, **kwargs):
+        reader = self.get_values_reader()
+        queryset = reader.queryset(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        with measure_serialization():
+            data = reader.represent(queryset if page is None else page)
+        if page is None:
+            return Response(data)
+        return self.get_paginated_response(data)
+
+# Mixin que responde 304 (Not Modified) nas listagens e detalhes quando nada mudou,
+# usando a contagem e o maior updated_at do queryset (e das tags/membros embutidos, ver
+# related_fields) como versão, sem serializar nada.
+# As listagens só têm ETag: excluir uma linha não avança o maior updated_at, então um
+# Last-Modified nelas deixaria If-Modified-Since devolver 304 com a lista desatualizada.
+class ConditionalGetMixin:
+    related_fields = ()  # Relações embutidas na resposta (ex: tag_detail): alterá-las também muda a versão
+
+    def get_validators(self, version, updated_at):
+        """
+        Monta o ETag e o Last-Modified (timestamp) a partir da versão do recurso.
+        O formato da resposta (JSON, API navegável, ...) faz parte do ETag.
+        """
+        etag = quote_etag(f"{self.request.accepted_renderer.format}-{version}")
+        last_modified = int(updated_at.timestamp()) if updated_at else None
+        return etag, last_modified
+
+    def set_validators(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        state = self.filter_queryset(self.get_queryset()).aggregate(count=Count('pk'), updated_at=Max('updated_at'))
+        updated_at = state['updated_at']
+        related = [model.objects.aggregate(updated_at=Max('updated_at'))['updated_at']
+                   for model in related_models(self.queryset.model, self.related_fields)]
+        version = format_version(state['count'], [updated_at] + related)
+        etag, _ = self.get_validators(version, updated_at)
+
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        return self.set_validators(super().list(request, *args, **kwargs), etag, None)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        # As relações embutidas já vêm no mesmo SELECT (select_related); com ?fields=, só as pedidas
+        stamps = [instance.updated_at] + [
+            getattr(instance, name).updated_at for name in self.related_fields if instance._meta.get_field(name).is_cached(instance)
+        ]
+        etag, last_modified = self.get_validators(format_version(instance.pk, stamps), max(stamps))
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+        return self.set_validators(Response(self.get_serializer(instance).data), etag, last_modified)
+
 # ViewSet para operações com transações (CRUD completo)
-class TransactionViewSet(viewsets.ModelViewSet):
-    queryset = Transaction.objects.all()  # Consulta todas as transações
+class TransactionViewSet(InstrumentedViewMixin, QueryParamsMixin, ConditionalGetMixin, ValuesListMixin, BackgroundJobMixin, viewsets.ModelViewSet):
+    queryset = Transaction.objects.select_related('tag', 'member')  # Carrega tag e membro no mesmo SELECT
     serializer_class = TransactionSerializer  # Usa o serializer correspondente
+    related_fields = ('tag', 'member')  # tag_detail e member_detail
+    ordering = ('due_date', 'id')  # Ordenação usada pela paginação por cursor
+    ordering_fields = ('due_date', 'updated_at')
+    filter_serializer_class = TransactionFilterSerializer
 
     def destroy(self, request, *args, **kwargs):
         """
@@ -118,23 +730,96 @@ class TransactionViewSet(viewsets.ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=True, methods=['post'])
+    @idempotent
     def post_transaction(self, request, pk=None):
         """
         Ação personalizada que permite "postar" uma transação manualmente.
         Isso cria os objetos de despesa ou receita correspondentes.
+        Aceita "Prefer: respond-async" para postar em segundo plano e Idempotency-Key
+        para que novas tentativas devolvam a mesma resposta.
         """
-        transaction = get_object_or_404(Transaction, pk=pk)
-        if transaction.status != 'pending':
+        transaction = self.get_object()
+        if self.prefers_async(request):
+            return self.enqueue_job(request, 'post_transaction', {'id': transaction.pk})
+        try:
+            transaction.post()
+        except ValueError:
+            # Já postada (inclusive por outra requisição concorrente)
             return Response({'error': 'Transaction already posted'}, status=status.HTTP_400_BAD_REQUEST)
-        transaction.post()
         return Response({'message': 'Transaction posted successfully'})
 
+    @action(detail=True, methods=['get'])
+    def occurrences(self, request, pk=None):
+        """
+        Lista as ocorrências da transação no intervalo date_after/date_before: as já
+        gravadas e, além da janela materializada, as projetadas pela regra da recorrência.
+        """
+        transaction = self.get_object()
+        serializer = OccurrenceRangeSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        start = serializer.validated_data.get('date_after')
+        end = serializer.validated_data.get('date_before') or window_end()
+
+        entries = list(transaction.expenses.all()) + list(transaction.income_set.all())
+        entries = [entry for entry in entries if (start is None or entry.date >= start) and entry.date <= end]
+        entries += transaction.projected_entries(start, end)
+        entries.sort(key=lambda entry: entry.date)
+        return Response(OccurrenceSerializer(entries, many=True).data)
+
+    @action(detail=False, methods=['post'])
+    @idempotent
+    def post_batch(self, request):
+        """
+        Ação em lote que posta várias transações pendentes de uma só vez.
+        Recebe uma lista de IDs e/ou filtros, bloqueia as linhas e posta tudo
+        em uma única transação de banco, retornando o resultado por ID
+        (posted, not_pending, skipped quando fora dos filtros ou not_found).
+        Aceita "Prefer: respond-async" para postar em segundo plano.
+        """
+        serializer = TransactionBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if self.prefers_async(request):
+            return self.enqueue_job(request, 'post_batch', serializer.data)
+        return Response(post_transactions(serializer))
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_file(self, request):
+        """
+        Importa transações de um arquivo CSV ou OFX enviado no campo "file".
+        O arquivo é lido em streaming e gravado em lotes; linhas inválidas são
+        reportadas sem interromper a importação.
+        """
+        # Importação local: o importador reutiliza o TransactionSerializer deste módulo
+        from .importer import IMPORT_FORMATS, parse_csv, parse_ofx, import_transactions
+
+        upload = request.FILES.get('file')
+        file_format = request.data.get('format', 'csv')
+        if upload is None:
+            return Response({'error': 'A file is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if file_format not in IMPORT_FORMATS:
+            return Response({'error': f'Unsupported format: {file_format}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        rows = parse_csv(stream) if file_format == 'csv' else parse_ofx(stream, member=request.data.get('member'))
+
+        errors = []
+        def on_error(row, row_errors):
+            if len(errors) < MAX_REPORTED_IMPORT_ERRORS:
+                errors.append({'row': row, 'errors': row_errors})
+
+        result = import_transactions(rows, on_error=on_error)
+        return Response({**result, 'errors': errors})
+
 # ViewSet somente leitura para visualizar despesas
-class ExpenseViewSet(viewsets.ReadOnlyModelViewSet):
+class ExpenseViewSet(InstrumentedViewMixin, QueryParamsMixin, ConditionalGetMixin, ValuesListMixin, StreamingExportMixin, BatchClearMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Expense.objects.all()  # Consulta todas as despesas
     serializer_class = ExpenseSerializer
+    ordering = ('date', 'id')
+    ordering_fields = ('date', 'updated_at')
+    filter_serializer_class = EntryFilterSerializer
 
     @action(detail=True, methods=['post'])
+    @idempotent
     def clear(self, request, pk=None):
         """
         Ação personalizada para marcar uma despesa como "cleared" (concluída).
@@ -144,11 +829,15 @@ class ExpenseViewSet(viewsets.ReadOnlyModelViewSet):
         return Response({'message': 'Expense cleared successfully'})
 
 # ViewSet somente leitura para visualizar receitas
-class IncomeViewSet(viewsets.ReadOnlyModelViewSet):
+class IncomeViewSet(InstrumentedViewMixin, QueryParamsMixin, ConditionalGetMixin, ValuesListMixin, StreamingExportMixin, BatchClearMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Income.objects.all()  # Consulta todas as receitas
     serializer_class = IncomeSerializer
+    ordering = ('date', 'id')
+    ordering_fields = ('date', 'updated_at')
+    filter_serializer_class = EntryFilterSerializer
 
     @action(detail=True, methods=['post'])
+    @idempotent
     def clear(self, request, pk=None):
         """
         Ação personalizada para marcar uma receita como "cleared" (concluída).
@@ -158,11 +847,81 @@ class IncomeViewSet(viewsets.ReadOnlyModelViewSet):
         return Response({'message': 'Income cleared successfully'})
 
 # ViewSet completo (CRUD) para as tags
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(InstrumentedViewMixin, viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    ordering = ('name', 'id')
 
 # ViewSet completo (CRUD) para os membros da família
-class FamilyMemberViewSet(viewsets.ModelViewSet):
+class FamilyMemberViewSet(InstrumentedViewMixin, viewsets.ModelViewSet):
     queryset = FamilyMember.objects.all()
     serializer_class = FamilyMemberSerializer
+    ordering = ('name', 'id')
+
+# ViewSet somente leitura com o resumo mensal pré-calculado
+class MonthlyRollupViewSet(InstrumentedViewMixin, ValuesListMixin, BackgroundJobMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = MonthlyRollup.objects.all()
+    serializer_class = MonthlyRollupSerializer
+    ordering = ('month', 'id')
+
+    @action(detail=False, methods=['post'])
+    def rebuild(self, request):
+        """
+        Enfileira o recálculo completo do resumo mensal (sempre em segundo plano).
+        """
+        return self.enqueue_job(request, 'rebuild_rollups', {})
+
+# ViewSet somente leitura com o saldo consolidado de cada membro (ID do membro na URL)
+class MemberBalanceViewSet(InstrumentedViewMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = MemberBalance.objects.all()
+    serializer_class = MemberBalanceSerializer
+    ordering = ('member_id',)
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Saldo do membro, lido com uma única consulta pela chave primária.
+        """
+        try:
+            balance = self.get_object()
+        except Http404:
+            # Membro ainda sem lançamentos: saldo zerado (404 se o membro não existir)
+            balance = MemberBalance(member=generics.get_object_or_404(FamilyMember.objects.all(), pk=kwargs['pk']))
+        return Response(self.get_serializer(balance).data)
+
+# ViewSet somente leitura para acompanhar as tarefas em segundo plano
+class JobViewSet(InstrumentedViewMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    ordering = ('-created_at', '-id')
+
+# ViewSet somente leitura com o resumo de fluxo de caixa (totais agregados no banco)
+class SummaryViewSet(viewsets.ViewSet):
+    def list(self, request):
+        """
+        Retorna os totais de despesas e receitas por mês, tag, membro e status.
+        Aceita os filtros date_after, date_before, member, tag e status.
+        """
+        serializer = EntryFilterSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        summary = {}
+        for transaction_type, model in [('expense', Expense), ('income', Income)]:
+            querysets = summary_querysets(serializer.filter_queryset(model.objects.all()))
+            summary[transaction_type] = {
+                dimension: [format_summary_row(row) for row in queryset]
+                for dimension, queryset in querysets.items()
+            }
+        return Response(summary)
+
+# ViewSet somente leitura com a projeção do saldo (diário ou mensal) para os próximos meses
+class ForecastViewSet(viewsets.ViewSet):
+    def list(self, request):
+        """
+        Projeta o saldo a partir de hoje: despesas/receitas não concluídas mais as transações
+        pendentes e recorrências futuras. Aceita months (1 a 60), granularity (daily|monthly),
+        member e opening_balance. O resultado fica em cache até os dados mudarem.
+        """
+        serializer = ForecastSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        return Response(cached_projection(data.get('member'), data['months'], data['granularity'], data['opening_balance']))
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +44,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primeiro da lista para medir a requisição inteira (ver app_ff/instrumentation.py)
+    'app_ff.instrumentation.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -77,12 +80,61 @@ WSGI_APPLICATION = 'f_finance.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# O banco é escolhido por variáveis de ambiente. Sem nada configurado, usa SQLite.
+#
+# PostgreSQL (ex: um banco descartável para testes locais):
+#   docker run --rm -p 5432:5432 -e POSTGRES_PASSWORD=postgres postgres:16
+#   DB_ENGINE=postgresql DB_PASSWORD=postgres python manage.py test
+#
+# DB_POOL=1 usa o pool de conexões nativo do Django (psycopg 3, "psycopg[pool]"); sem ele,
+# as conexões são persistentes (DB_CONN_MAX_AGE) e verificadas antes de cada requisição.
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DB_POOL = os.environ.get('DB_POOL', '0') == '1'
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'f_finance'),
+            'USER': os.environ.get('DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            # O pool nativo não pode ser combinado com conexões persistentes
+            'CONN_MAX_AGE': 0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+                    'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+                    'timeout': int(os.environ.get('DB_POOL_TIMEOUT', '10')),
+                },
+            } if DB_POOL else {},
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # WAL deixa leituras concorrentes com a escrita; NORMAL é seguro com WAL
+                # e evita um fsync por commit; busy_timeout espera o lock em vez de falhar
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    f"PRAGMA busy_timeout={int(os.environ.get('DB_BUSY_TIMEOUT_MS', '5000'))};"
+                ),
+                # Pega o lock de escrita no início da transação, evitando "database is locked"
+                # quando duas transações tentam promover a leitura para escrita ao mesmo tempo
+                'transaction_mode': 'IMMEDIATE',
+            },
+            # Banco de testes em arquivo: o banco em memória compartilhado entre threads
+            # falha na hora com "table is locked" (sem busy_timeout) nos testes concorrentes
+            'TEST': {'NAME': os.environ.get('DB_TEST_NAME', BASE_DIR / 'test_db.sqlite3')},
+        }
     }
-}
 
 
 # Password validation
@@ -127,3 +179,55 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CORS_ALLOW_ALL_ORIGINS = True
+
+REST_FRAMEWORK = {
+    # Paginação por cursor (keyset) em todos os endpoints de listagem, sem OFFSET
+    'DEFAULT_PAGINATION_CLASS': 'app_ff.pagination.KeysetPagination',
+    'PAGE_SIZE': 100,
+    # JSON via orjson (ver app_ff/renderers.py), com a API navegável mantida
+    'DEFAULT_RENDERER_CLASSES': [
+        'app_ff.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'app_ff.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# Cache de tags e membros da família (ver app_ff/cache.py).
+# Use 'BACKEND': 'django' para compartilhar o cache entre processos via CACHES.
+APP_FF_REFERENCE_CACHE = {
+    'BACKEND': 'local',
+    'TIMEOUT': 300,
+    'MAX_SIZE': 1024,
+}
+
+# Cache das projeções (/api/forecast/), separado para não disputar o LRU com as tags e membros
+APP_FF_FORECAST_CACHE = {
+    'BACKEND': 'local',
+    'TIMEOUT': 300,
+    'MAX_SIZE': 128,
+}
+
+# Meses à frente em que as despesas recorrentes ficam gravadas; o comando
+# materialize_recurrences deve rodar periodicamente (ex: diariamente) para avançar a janela.
+APP_FF_RECURRENCE_WINDOW_MONTHS = 3
+
+# Instrumentação de desempenho: cabeçalho Server-Timing nas respostas e log das
+# consultas mais lentas que APP_FF_SLOW_QUERY_MS (desligado quando não definido).
+APP_FF_SERVER_TIMING = True
+APP_FF_SLOW_QUERY_MS = int(os.environ['APP_FF_SLOW_QUERY_MS']) if os.environ.get('APP_FF_SLOW_QUERY_MS') else None
+
+# Fila de tarefas em segundo plano (ver app_ff/jobs.py e o comando run_workers):
+# tentativas por tarefa, espera antes da 2ª tentativa (dobra a cada nova) e segundos
+# até uma tarefa em execução ser considerada abandonada e voltar para a fila.
+APP_FF_JOB_MAX_ATTEMPTS = 3
+APP_FF_JOB_RETRY_DELAY = 5
+APP_FF_JOB_TIMEOUT = 600
+
+# Horas em que uma Idempotency-Key das ações síncronas (postagem, conclusões) continua
+# devolvendo a resposta guardada (ver app_ff/idempotency.py). As vencidas são removidas
+# pelo comando purge_idempotency_keys, que deve rodar periodicamente.
+APP_FF_IDEMPOTENCY_TTL_HOURS = 24